@@ -3,13 +3,17 @@ Complete Backend API for ResumeGPT with Conversation Memory
 Provides clean REST endpoints for frontend applications
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 import os
 import sys
+import asyncio
+import functools
 import logging
+import orjson
 
 # Add services to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
@@ -17,7 +21,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from services.resume_service import ResumeProcessor
 from services.vector_service import VectorService
 from services.conversation_service import ConversationService
-from services.generation_service import gen_cover_letter, gen_interview_questions
+from services.generation_service import agen_cover_letter, agen_interview_questions, astream_cover_letter
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -27,7 +31,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="ResumeGPT API",
     description="Backend API for ResumeGPT with conversation memory",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse  # C-speed JSON for chat history payloads
 )
 
 # Enable CORS for frontend communication
@@ -42,6 +47,19 @@ app.add_middleware(
 # Global state (in production, use proper state management)
 conversation_service: Optional[ConversationService] = None
 
+# Resumes are a few hundred KB at most; anything past this is rejected unparsed
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+
+@functools.lru_cache(maxsize=1)
+def _resume_processor() -> ResumeProcessor:
+    """Shared resume processor, created on first upload"""
+    return ResumeProcessor()
+
+@functools.lru_cache(maxsize=1)
+def _vector_service() -> VectorService:
+    """Shared vector service, so embeddings are set up once per worker"""
+    return VectorService()
+
 # Pydantic models for request/response
 class QuestionRequest(BaseModel):
     question: str
@@ -56,6 +74,17 @@ class CoverLetterRequest(BaseModel):
 class InterviewRequest(BaseModel):
     role: str
 
+# Questions most users ask first; answering them early hides the LLM latency
+DEFAULT_PREFETCH_QUESTIONS = [
+    "What are the key skills?",
+    "Summarize the work experience",
+    "What programming languages does this person know?",
+    "What is their educational background?",
+]
+
+class PrefetchRequest(BaseModel):
+    questions: List[str] = DEFAULT_PREFETCH_QUESTIONS
+
 class StandardResponse(BaseModel):
     status: str
     message: str
@@ -81,9 +110,12 @@ async def root():
         "endpoints": {
             "upload": "POST /upload - Upload and process resume",
             "ask": "POST /ask - Ask questions with memory",
+            "ask-stream": "POST /ask-stream - Ask questions, streaming the answer as server-sent events",
+            "prefetch": "POST /prefetch - Answer common questions in the background to warm the cache",
             "clear-memory": "POST /clear-memory - Clear conversation memory",
             "memory-summary": "GET /memory-summary - Get memory usage",
             "cover-letter": "GET /cover-letter - Generate cover letter",
+            "cover-letter-stream": "POST /cover-letter-stream - Generate cover letter, streaming it as server-sent events",
             "interview": "GET /interview - Generate interview questions"
         }
     }
@@ -93,36 +125,38 @@ async def upload_resume(file: UploadFile = File(...)):
     """Upload and process resume file"""
     global conversation_service
     
+    # Validate file type
+    if not file.filename.lower().endswith(('.pdf', '.docx', '.txt')):
+        raise HTTPException(
+            status_code=400, 
+            detail="Unsupported file type. Please upload PDF, DOCX, or TXT files."
+        )
+    
+    # Resumes are small, so parse the upload in memory instead of writing it to disk;
+    # reading one byte past the limit is enough to spot an oversized file
+    data = await file.read(MAX_UPLOAD_BYTES + 1)
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File too large. The maximum size is {MAX_UPLOAD_BYTES // (1024 * 1024)} MB."
+        )
+    file_size = len(data)
+    
     try:
-        # Validate file type
-        if not file.filename.lower().endswith(('.pdf', '.docx', '.txt')):
-            raise HTTPException(
-                status_code=400, 
-                detail="Unsupported file type. Please upload PDF, DOCX, or TXT files."
-            )
-        
-        # Create uploads directory
-        upload_dir = "data/uploads"
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        # Save uploaded file
-        file_path = os.path.join(upload_dir, file.filename)
+        logger.info(f"Received uploaded file: {file.filename} ({file_size} bytes)")
         
-        with open(file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
-        
-        logger.info(f"Saved uploaded file: {file_path}")
+        # Parsing and embedding block, so run them in the default threadpool
+        loop = asyncio.get_running_loop()
         
         # Process resume
-        processor = ResumeProcessor()
-        chunks = processor.load_resume(file_path)
+        processor = _resume_processor()
+        chunks = await loop.run_in_executor(None, processor.load_resume, file.filename, data)
         
         logger.info(f"Processed resume into {len(chunks)} chunks")
         
         # Create vector store
-        vector_service = VectorService()
-        vector_store = vector_service.create_vector_store(chunks)
+        vector_service = await loop.run_in_executor(None, _vector_service)
+        vector_store = await loop.run_in_executor(None, vector_service.create_vector_store, chunks)
         
         # Initialize conversation service
         conversation_service = ConversationService(vector_store, memory_type="buffer")
@@ -135,7 +169,7 @@ async def upload_resume(file: UploadFile = File(...)):
             "data": {
                 "filename": file.filename,
                 "chunks_created": len(chunks),
-                "file_size": len(content)
+                "file_size": file_size
             }
         }
         
@@ -164,7 +198,7 @@ async def ask_question(request: QuestionRequest):
             logger.info(f"Switched to {request.memory_type} memory")
         
         # Get response
-        response = conversation_service.ask_question(request.question)
+        response = await conversation_service.aask_question(request.question)
         
         return {
             "status": "success",
@@ -181,6 +215,75 @@ async def ask_question(request: QuestionRequest):
             detail=f"Error processing question: {str(e)}"
         )
 
+def _sse(data: dict, event: Optional[str] = None) -> bytes:
+    """Format one server-sent event"""
+    prefix = f"event: {event}\n".encode() if event else b""
+    return prefix + b"data: " + orjson.dumps(data) + b"\n\n"
+
+@app.post("/ask-stream")
+async def ask_question_stream(request: QuestionRequest):
+    """Ask a question with conversation memory, streaming answer tokens as SSE
+    
+    Emits `data: {"token": ...}` events, then one `done` event with the sources
+    and conversation length (or an `error` event).
+    """
+    global conversation_service
+    
+    if not conversation_service:
+        raise HTTPException(
+            status_code=400,
+            detail="No resume uploaded. Please upload a resume first."
+        )
+    
+    if conversation_service.memory_type != request.memory_type:
+        try:
+            conversation_service.switch_memory_type(request.memory_type)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        logger.info(f"Switched to {request.memory_type} memory")
+    
+    service = conversation_service
+    
+    async def event_stream():
+        try:
+            # Per-request holder: last_response is shared with any overlapping request
+            response = {}
+            async for token in service.astream_question(request.question, response):
+                yield _sse({"token": token})
+            yield _sse({
+                "sources": response["source_chunks"],
+                "conversation_length": len(response["chat_history"])
+            }, event="done")
+        except Exception as e:
+            logger.error(f"Error streaming answer: {str(e)}")
+            yield _sse({"error": f"Error processing question: {str(e)}"}, event="error")
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+@app.post("/prefetch")
+async def prefetch_questions(request: PrefetchRequest, background_tasks: BackgroundTasks):
+    """Answer likely questions in the background so later asks hit the response cache"""
+    global conversation_service
+    
+    if not conversation_service:
+        raise HTTPException(
+            status_code=400,
+            detail="No resume uploaded. Please upload a resume first."
+        )
+    
+    if conversation_service.response_cache is None:
+        return {
+            "status": "skipped",
+            "message": "Response cache unavailable (no embeddings model), nothing to prefetch"
+        }
+    
+    background_tasks.add_task(conversation_service.aprefetch, request.questions)
+    return {
+        "status": "accepted",
+        "message": f"Prefetching {len(request.questions)} questions",
+        "data": {"questions": request.questions}
+    }
+
 @app.post("/clear-memory")
 async def clear_conversation_memory(request: ClearMemoryRequest):
     """Clear conversation history"""
@@ -250,7 +353,7 @@ async def generate_cover_letter(job_desc: str):
         )
     
     try:
-        cover_letter = gen_cover_letter(job_desc)
+        cover_letter = await agen_cover_letter(job_desc)
         
         return {
             "status": "success",
@@ -264,6 +367,29 @@ async def generate_cover_letter(job_desc: str):
             detail=f"Error generating cover letter: {str(e)}"
         )
 
+@app.post("/cover-letter-stream")
+async def generate_cover_letter_stream(request: CoverLetterRequest):
+    """Generate a cover letter, streaming tokens as SSE
+    
+    Emits `data: {"token": ...}` events, then one `done` event (or an `error` event).
+    """
+    if not request.job_description.strip():
+        raise HTTPException(
+            status_code=400,
+            detail="Job description is required"
+        )
+    
+    async def event_stream():
+        try:
+            async for token in astream_cover_letter(request.job_description):
+                yield _sse({"token": token})
+            yield _sse({}, event="done")
+        except Exception as e:
+            logger.error(f"Error streaming cover letter: {str(e)}")
+            yield _sse({"error": f"Error generating cover letter: {str(e)}"}, event="error")
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 @app.get("/interview")
 async def generate_interview_questions(role: str):
     """Generate interview questions for specific role"""
@@ -274,7 +400,7 @@ async def generate_interview_questions(role: str):
         )
     
     try:
-        questions = gen_interview_questions(role)
+        questions = await agen_interview_questions(role)
         
         return {
             "status": "success",
@@ -331,8 +457,8 @@ async def not_found_handler(request, exc):
         "status": "error",
         "error": "Endpoint not found",
         "available_endpoints": [
-            "/health", "/upload", "/ask", "/clear-memory", 
-            "/memory-summary", "/cover-letter", "/interview"
+            "/health", "/upload", "/ask", "/ask-stream", "/prefetch", "/clear-memory", 
+            "/memory-summary", "/cover-letter", "/cover-letter-stream", "/interview"
         ]
     }
 
@@ -357,10 +483,15 @@ if __name__ == "__main__":
     print("")
     print("💡 Start the frontend with: streamlit run frontend/streamlit/chat_app.py")
     
+    # Conversation state lives in this process, so each worker has its own
+    # memory. Only raise WEB_CONCURRENCY behind a sticky-session proxy.
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+        reload=False,
         log_level="info"
     )
@@ -1,18 +1,23 @@
+import aiofiles
 from fastapi import FastAPI, File, UploadFile
 from services.resume_service import load_resume
 from services.vector_service import build_faiss_index
-from services.generation_service import answer_query, gen_cover_letter, gen_interview_questions
+from services.generation_service import answer_query, gen_cover_letter, gen_interview_questions, clear_store_cache
 
 app = FastAPI()
 
+UPLOAD_CHUNK_SIZE = 1 << 16  # 64 KB
+
 
 @app.post("/upload")
 async def upload(file: UploadFile = File(...)):
     path = f"data/uploads/{file.filename}"
-    with open(path, "wb") as f:
-        f.write(await file.read())
+    async with aiofiles.open(path, "wb") as f:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            await f.write(chunk)
     docs = load_resume(path)
     build_faiss_index(docs)
+    clear_store_cache()
     return {"status": "indexed"}
 
 
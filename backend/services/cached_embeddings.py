@@ -0,0 +1,121 @@
+# backend/services/cached_embeddings.py
+import time
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, List
+from langchain.embeddings.base import Embeddings
+
+CACHE_MAXSIZE = 10_000
+
+
+class CachedEmbeddings(Embeddings):
+    """Exact-match LRU cache in front of any embeddings object
+    
+    Don't wrap embeddings that set caches_embeddings; they already cache internally.
+    """
+
+    def __init__(self, embeddings: Embeddings, maxsize: int = CACHE_MAXSIZE):
+        self.embeddings = embeddings
+        self.maxsize = maxsize
+        self.model = getattr(embeddings, "model", type(embeddings).__name__)
+        # float32 arrays: ~6 KB per 1536-d vector, vs ~49 KB as a tuple of Python floats
+        self._cache: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._embed_seconds = 0.0
+
+    def __getattr__(self, name):
+        # Expose the wrapped object's attributes (e.g. has_embeddings)
+        if name == "embeddings":
+            raise AttributeError(name)
+        return getattr(self.embeddings, name)
+
+    def _key(self, text: str) -> bytes:
+        return hashlib.sha256(f"{self.model}\0{text}".encode("utf-8")).digest()
+
+    def _lookup(self, texts: List[str]):
+        """Return cache keys, cached vectors, and indices still to embed"""
+        keys = [self._key(text) for text in texts]
+        vectors: List = [None] * len(texts)
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                cached = self._cache.get(key)
+                if cached is None:
+                    missing.append(i)
+                else:
+                    self._cache.move_to_end(key)
+                    vectors[i] = cached.tolist()
+            self._hits += len(texts) - len(missing)
+            self._misses += len(missing)
+        return keys, vectors, missing
+
+    def _store(self, keys, vectors, missing, embedded, elapsed) -> List[List[float]]:
+        """Place freshly embedded vectors into their positions and cache them"""
+        with self._lock:
+            self._embed_seconds += elapsed
+            for i, vector in zip(missing, embedded):
+                vectors[i] = vector
+                self._cache[keys[i]] = np.asarray(vector, dtype=np.float32)
+                self._cache.move_to_end(keys[i])
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents, sending only cache misses to the wrapped embeddings"""
+        keys, vectors, missing = self._lookup(texts)
+        if not missing:
+            return vectors
+        start = time.perf_counter()
+        embedded = self.embeddings.embed_documents([texts[i] for i in missing])
+        return self._store(keys, vectors, missing, embedded, time.perf_counter() - start)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents asynchronously, sending only cache misses"""
+        keys, vectors, missing = self._lookup(texts)
+        if not missing:
+            return vectors
+        start = time.perf_counter()
+        embedded = await self.embeddings.aembed_documents([texts[i] for i in missing])
+        return self._store(keys, vectors, missing, embedded, time.perf_counter() - start)
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query, serving repeats from the cache"""
+        keys, vectors, missing = self._lookup([text])
+        if not missing:
+            return vectors[0]
+        start = time.perf_counter()
+        embedded = self.embeddings.embed_query(text)
+        return self._store(keys, vectors, missing, [embedded], time.perf_counter() - start)[0]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Embed a query asynchronously, serving repeats from the cache"""
+        keys, vectors, missing = self._lookup([text])
+        if not missing:
+            return vectors[0]
+        start = time.perf_counter()
+        embedded = await self.embeddings.aembed_query(text)
+        return self._store(keys, vectors, missing, [embedded], time.perf_counter() - start)[0]
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and time spent in the wrapped embeddings"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "size": len(self._cache),
+                "embed_seconds": round(self._embed_seconds, 4),
+            }
+
+    def clear(self) -> None:
+        """Drop every cached vector and reset the counters"""
+        with self._lock:
+            self._cache.clear()
+            self._hits = self._misses = 0
+            self._embed_seconds = 0.0
@@ -1,32 +1,85 @@
 # backend/services/conversation_service.py
-from langchain.chains import ConversationalRetrievalChain
+from langchain.chains import ConversationalRetrievalChain, LLMChain, StuffDocumentsChain
 from langchain.memory import ConversationBufferMemory, ConversationBufferWindowMemory, ConversationSummaryBufferMemory
 from langchain.prompts import PromptTemplate
-from .deepseek_service import get_deepseek_llm
+from .deepseek_service import get_deepseek_llm, DEEPSEEK_ERROR_PREFIX
+from .semantic_cache import SemanticCache
+from .streaming import ChainTokenStream
 from langchain_community.chat_models import ChatOpenAI
 import os
+import re
+import asyncio
+from typing import Optional
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Rough English average, for estimating token counts from character counts
+CHARS_PER_TOKEN = 4
+
+# Answer length cap for preview_mode, where callers only display the first line or so
+PREVIEW_MAX_TOKENS = 48
+
+# Words that point back at earlier turns ("which of those?"); such questions are
+# not standalone, so the response cache never answers them. "they"/"their" are
+# left out: in resume Q&A they almost always mean the candidate.
+_FOLLOWUP_RE = re.compile(r"\b(it|its|those|these|above|earlier|previous|mentioned|former|latter)\b", re.IGNORECASE)
+
+# Custom prompt for conversational resume Q&A (parsed once at import)
+_RESUME_QA_PROMPT = PromptTemplate.from_template(
+    """You are a helpful assistant analyzing a resume. Use the conversation history and resume context to answer questions naturally.
+
+Previous conversation:
+{chat_history}
+
+Resume context:
+{context}
+
+Current question: {question}
+
+Instructions:
+- Reference previous conversation when relevant (use phrases like "As I mentioned earlier" or "Building on what we discussed")
+- Answer based on the resume content provided
+- If information isn't in the resume, say "This information is not available in the resume"
+- Be conversational and remember what was discussed earlier
+- Use specific examples from the resume when possible
+- If the question refers to something from earlier in the conversation (like "those skills" or "that company"), use the chat history to understand the reference
+
+Answer:"""
+)
+
+
 class ConversationService:
-    def __init__(self, vector_store, memory_type="buffer"):
-        # Initialize LLM
+    def __init__(self, vector_store, memory_type="buffer", cache_threshold=0.95, cache_max_entries=256):
+        # Initialize LLMs: answers are streamed, question rephrasing and summaries are not
         try:
             self.llm = get_deepseek_llm()
+            self.answer_llm = get_deepseek_llm(streaming=True)
             print("✅ Using DeepSeek LLM for conversations")
         except Exception as e:
             print(f"⚠️  DeepSeek not available ({e}), falling back to OpenAI")
-            self.llm = ChatOpenAI(
-                temperature=0.7,
-                model="gpt-3.5-turbo",
-                openai_api_key=os.getenv("OPENAI_API_KEY")
-            )
+            self.llm = self._create_openai_llm()
+            self.answer_llm = self._create_openai_llm(streaming=True)
         
+        self.last_response = None
         self.vector_store = vector_store
         self.memory_type = memory_type
         self.memory = self._create_memory(memory_type)
         self.conversation_chain = self._create_conversation_chain()
+        self.response_cache = self._create_response_cache(cache_threshold, cache_max_entries)
+    
+    def _create_openai_llm(self, streaming=False):
+        """Create the OpenAI fallback LLM"""
+        return ChatOpenAI(
+            temperature=0.7,
+            model="gpt-3.5-turbo",
+            openai_api_key=os.getenv("OPENAI_API_KEY"),
+            streaming=streaming
+        )
+    
+    def _create_response_cache(self, threshold, max_entries):
+        """Create a semantic response cache if the vector store has real embeddings"""
+        return SemanticCache.for_vector_store(self.vector_store, threshold=threshold, max_entries=max_entries)
     
     def _create_memory(self, memory_type="buffer"):
         """Create appropriate memory type"""
@@ -63,38 +116,16 @@ class ConversationService:
     def _create_conversation_chain(self):
         """Create conversational retrieval chain"""
         
-        # Custom prompt for conversational resume Q&A
-        custom_prompt = PromptTemplate.from_template(
-            """You are a helpful assistant analyzing a resume. Use the conversation history and resume context to answer questions naturally.
-
-Previous conversation:
-{chat_history}
-
-Resume context:
-{context}
-
-Current question: {question}
-
-Instructions:
-- Reference previous conversation when relevant (use phrases like "As I mentioned earlier" or "Building on what we discussed")
-- Answer based on the resume content provided
-- If information isn't in the resume, say "This information is not available in the resume"
-- Be conversational and remember what was discussed earlier
-- Use specific examples from the resume when possible
-- If the question refers to something from earlier in the conversation (like "those skills" or "that company"), use the chat history to understand the reference
-
-Answer:"""
-        )
-        
         # Create conversational retrieval chain
         chain = ConversationalRetrievalChain.from_llm(
-            llm=self.llm,
+            llm=self.answer_llm,
+            condense_question_llm=self.llm,
             retriever=self.vector_store.as_retriever(
                 search_type="similarity",
                 search_kwargs={"k": 4}
             ),
             memory=self.memory,
-            combine_docs_chain_kwargs={"prompt": custom_prompt},
+            combine_docs_chain_kwargs={"prompt": _RESUME_QA_PROMPT},
             return_source_documents=True,
             verbose=True  # Helpful for debugging
         )
@@ -102,13 +133,160 @@ Answer:"""
         print("✅ Conversational RAG Chain initialized!")
         return chain
     
-    def ask_question(self, question: str):
-        """Ask a question with conversation context"""
+    def ask_question(self, question: str, preview_mode: bool = False):
+        """Ask a question with conversation context
+        
+        preview_mode caps the answer at PREVIEW_MAX_TOKENS; preview answers are not cached.
+        """
         print(f"❓ Question: {question}")
         
+        # Serve near-duplicate questions from the semantic cache
+        query_vector = None
+        store = self._stores_answers() and not preview_mode
+        if self._cache_applies(question):
+            query_vector = self.response_cache.embed(question)
+            cached = self._cached_response(question, query_vector)
+            if cached is not None:
+                return cached
+        
         # Get response from conversational chain
-        result = self.conversation_chain({"question": question})
+        result = self._chain_for(preview_mode)({"question": question})
+        return self._build_response(question, result, query_vector if store else None)
+    
+    async def aask_question(self, question: str, preview_mode: bool = False):
+        """Ask a question with conversation context without blocking the event loop"""
+        print(f"❓ Question: {question}")
+        
+        query_vector = None
+        store = self._stores_answers() and not preview_mode
+        if self._cache_applies(question):
+            query_vector = await self.response_cache.aembed(question)
+            cached = self._cached_response(question, query_vector)
+            if cached is not None:
+                return cached
+        
+        result = await self._chain_for(preview_mode).ainvoke({"question": question})
+        return self._build_response(question, result, query_vector if store else None)
+    
+    async def aprefetch(self, questions):
+        """Answer standalone questions ahead of time to warm the semantic response cache
+        
+        Each question runs concurrently through this service's chain with its own empty
+        buffer memory, so the current conversation's memory is untouched. The answers
+        then serve any standalone question (see _cache_applies), at any point of a
+        conversation. Returns how many were answered.
+        """
+        if self.response_cache is None:
+            return 0
         
+        async def answer(question):
+            query_vector = await self.response_cache.aembed(question)
+            if self.response_cache.lookup(query_vector) is not None:
+                return
+            chain = self._chain_with(self._create_memory("buffer"))
+            result = await chain.ainvoke({"question": question})
+            self._cache_answer(query_vector, result["answer"], [
+                doc.page_content for doc in result.get("source_documents", [])
+            ])
+        
+        results = await asyncio.gather(*(answer(q) for q in questions), return_exceptions=True)
+        return sum(not isinstance(result, Exception) for result in results)
+    
+    def _chain_with(self, memory, combine_docs_chain=None):
+        """A chain reusing this service's LLMs, retriever and prompts with other parts swapped in"""
+        base = self.conversation_chain
+        chain = ConversationalRetrievalChain(
+            retriever=base.retriever,
+            combine_docs_chain=combine_docs_chain or base.combine_docs_chain,
+            question_generator=base.question_generator,
+            return_source_documents=True
+        )
+        # Assigned after construction: pydantic validation would store a copy of the memory
+        chain.memory = memory
+        return chain
+    
+    def _chain_for(self, preview_mode):
+        """The chain for one call; preview calls get their own answer step capped at PREVIEW_MAX_TOKENS
+        
+        The cap is set on a per-call copy of the answering chain, never on the shared
+        one, so a preview cannot truncate a concurrent full answer.
+        """
+        if not preview_mode:
+            return self.conversation_chain
+        combine = self.conversation_chain.combine_docs_chain
+        preview_combine = StuffDocumentsChain(
+            llm_chain=LLMChain(
+                llm=combine.llm_chain.llm,
+                prompt=combine.llm_chain.prompt,
+                llm_kwargs={"max_tokens": PREVIEW_MAX_TOKENS}
+            ),
+            document_prompt=combine.document_prompt,
+            document_variable_name=combine.document_variable_name,
+            document_separator=combine.document_separator
+        )
+        return self._chain_with(self.memory, preview_combine)
+    
+    async def astream_question(self, question: str, result: Optional[dict] = None):
+        """Ask a question and yield answer tokens as the LLM generates them
+        
+        When the stream ends, result (if given) holds the full response (with sources).
+        Prefer it over last_response, which a concurrent question may overwrite.
+        """
+        print(f"❓ Question: {question}")
+        
+        query_vector = None
+        store = self._stores_answers()
+        if self._cache_applies(question):
+            query_vector = await self.response_cache.aembed(question)
+            cached = self._cached_response(question, query_vector)
+            if cached is not None:
+                if result is not None:
+                    result.update(cached)
+                yield cached["answer"]
+                return
+        
+        stream = ChainTokenStream(self.conversation_chain, {"question": question}, output_key="answer")
+        async for token in stream:
+            yield token
+        response = self._build_response(question, stream.result, query_vector if store else None)
+        if result is not None:
+            result.update(response)
+    
+    def _cache_applies(self, question):
+        """Whether the response cache may answer this question
+        
+        Entries are keyed on the question alone, so any standalone question can be
+        served mid-conversation; a follow-up like "which of those?" depends on the
+        history and always goes to the chain.
+        """
+        return self.response_cache is not None and not _FOLLOWUP_RE.search(question)
+    
+    def _stores_answers(self):
+        """Whether the next answer may be cached
+        
+        Only answers generated with empty memory are stored: once there is history,
+        the prompt lets the LLM lean on it ("As I mentioned earlier"), and such an
+        answer would read oddly when replayed in another conversation.
+        """
+        return self.response_cache is not None and not self.memory.chat_memory.messages
+    
+    def _cached_response(self, question, query_vector):
+        """Return a cached response for a near-duplicate question, recording it in memory"""
+        cached = self.response_cache.lookup(query_vector)
+        if cached is None:
+            return None
+        
+        print("⚡ Semantic cache hit")
+        self.memory.save_context({"question": question}, {"answer": cached["answer"]})
+        self.last_response = {
+            "question": question,
+            **cached,
+            "chat_history": self.get_chat_history_formatted()
+        }
+        return self.last_response
+    
+    def _build_response(self, question, result, query_vector=None):
+        """Shape a chain result into the API response and cache it"""
         response = {
             "question": question,
             "answer": result["answer"],
@@ -116,9 +294,19 @@ Answer:"""
             "chat_history": self.get_chat_history_formatted()
         }
         
+        if query_vector is not None:
+            self._cache_answer(query_vector, response["answer"], response["source_chunks"])
+        
         print(f"💬 Answer: {response['answer']}")
+        self.last_response = response
         return response
     
+    def _cache_answer(self, query_vector, answer, source_chunks):
+        """Add an answer to the response cache"""
+        # Never cache an API failure, or it would be served for every similar question
+        if not answer.startswith(DEEPSEEK_ERROR_PREFIX):
+            self.response_cache.add(query_vector, {"answer": answer, "source_chunks": source_chunks})
+    
     def get_chat_history(self):
         """Get current conversation history (raw)"""
         return self.memory.chat_memory.messages
@@ -126,18 +314,10 @@ Answer:"""
     def get_chat_history_formatted(self):
         """Get formatted conversation history"""
         messages = self.memory.chat_memory.messages
-        formatted = []
-        
-        for i in range(0, len(messages), 2):
-            if i + 1 < len(messages):
-                human_msg = messages[i].content
-                ai_msg = messages[i + 1].content
-                formatted.append({
-                    "question": human_msg,
-                    "answer": ai_msg
-                })
-        
-        return formatted
+        return [
+            {"question": human_msg.content, "answer": ai_msg.content}
+            for human_msg, ai_msg in zip(messages[::2], messages[1::2])
+        ]
     
     def clear_memory(self):
         """Clear conversation history"""
@@ -152,7 +332,8 @@ Answer:"""
             "memory_type": self.memory_type,
             "conversation_turns": len(messages) // 2,
             "last_messages": [msg.content for msg in messages[-4:]] if messages else [],
-            "estimated_tokens": sum(len(msg.content) for msg in messages) // 4
+            # Character-count estimate: len() is O(1) per message, no tokenizing needed
+            "estimated_tokens": sum(len(msg.content) for msg in messages) // CHARS_PER_TOKEN
         }
     
     def debug_memory(self):
@@ -163,12 +344,19 @@ Answer:"""
             msg_type = "Human" if i % 2 == 0 else "AI"
             print(f"  {i}: {msg_type}: {msg.content[:80]}...")
     
-    def switch_memory_type(self, new_memory_type):
-        """Switch to a different memory type (clears existing memory)"""
+    def switch_memory_type(self, new_memory_type, force=False):
+        """Switch to a different memory type (clears existing memory)
+        
+        The existing chain is kept and only its memory is swapped; pass
+        force=True to rebuild the whole chain.
+        """
         print(f"🔄 Switching from {self.memory_type} to {new_memory_type} memory")
-        self.memory_type = new_memory_type
         self.memory = self._create_memory(new_memory_type)
-        self.conversation_chain = self._create_conversation_chain()
+        self.memory_type = new_memory_type
+        if force:
+            self.conversation_chain = self._create_conversation_chain()
+        else:
+            self.conversation_chain.memory = self.memory
         print("✅ Memory type switched successfully!")
 
 
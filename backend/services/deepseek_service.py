@@ -1,29 +1,129 @@
 # backend/services/deepseek_service.py
 import os
+import time
+import asyncio
+import hashlib
+import functools
+import threading
+import weakref
+import httpx
 import numpy as np
-from typing import List, Optional, Any
+from collections import OrderedDict
+from typing import AsyncIterator, Iterator, List, Optional, Any
 from langchain.llms.base import LLM
+from langchain.schema.output import GenerationChunk
 from langchain.embeddings.base import Embeddings
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Query embeddings shared by every DeepSeekEmbeddings instance: sha256(text) -> (timestamp, vector)
+_GLOBAL_EMB_CACHE: "OrderedDict[str, tuple]" = OrderedDict()
+_EMB_CACHE_LOCK = threading.Lock()
+_EMB_CACHE_MAXSIZE = 2048
+_EMB_CACHE_TTL = float(os.getenv("EMBEDDING_CACHE_TTL", "3600"))  # seconds
+
+# DeepSeekLLM returns API failures as text starting with this prefix
+DEEPSEEK_ERROR_PREFIX = "Error calling DeepSeek API"
+
+EMBEDDING_MODEL = "text-embedding-ada-002"
+# Texts per embeddings request, capped at the API's per-request input limit
+MAX_EMBEDDING_INPUTS = 2048
+EMBEDDING_BATCH_SIZE = max(1, min(int(os.getenv("EMBEDDING_BATCH_SIZE", "256")), MAX_EMBEDDING_INPUTS))
+
+# Text features used by the fallback embeddings (after length/word counts)
+FALLBACK_EMBEDDING_DIM = 384
+FALLBACK_KEYWORDS = ('.', ',', 'python', 'javascript', 'experience', 'skills', 'project')
+
+
+DEEPSEEK_BASE_URL = "https://api.deepseek.com"
+HTTP_TIMEOUT = 60.0  # seconds
+HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+
+try:
+    import h2  # noqa: F401  (httpx needs it for HTTP/2)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+# One keep-alive connection pool per process, shared by every DeepSeek LLM and embeddings
+# instance so parallel calls reuse TLS connections (multiplexed when HTTP/2 is available)
+@functools.lru_cache(maxsize=1)
+def _deepseek_client() -> OpenAI:
+    return OpenAI(
+        api_key=os.getenv("DEEPSEEK_API_KEY"),
+        base_url=DEEPSEEK_BASE_URL,
+        http_client=httpx.Client(http2=HTTP2_AVAILABLE, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+    )
+
+
+# An httpx.AsyncClient is bound to the event loop it first ran on, and callers use several
+# loops per process (each asyncio.run, each server thread), so keep one client per loop
+_ASYNC_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = weakref.WeakKeyDictionary()
+_ASYNC_CLIENTS_LOCK = threading.Lock()
+
+
+def _deepseek_async_client() -> AsyncOpenAI:
+    """Return the async client for the running event loop, creating it on first use"""
+    loop = asyncio.get_running_loop()
+    with _ASYNC_CLIENTS_LOCK:
+        client = _ASYNC_CLIENTS.get(loop)
+        if client is None:
+            client = AsyncOpenAI(
+                api_key=os.getenv("DEEPSEEK_API_KEY"),
+                base_url=DEEPSEEK_BASE_URL,
+                http_client=httpx.AsyncClient(http2=HTTP2_AVAILABLE, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+            )
+            _ASYNC_CLIENTS[loop] = client
+        return client
+
+
+def _emb_cache_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _emb_cache_get(key: str) -> Optional[np.ndarray]:
+    """Return a cached embedding, or None if missing or expired"""
+    with _EMB_CACHE_LOCK:
+        entry = _GLOBAL_EMB_CACHE.get(key)
+        if entry is None:
+            return None
+        timestamp, vector = entry
+        if time.monotonic() - timestamp > _EMB_CACHE_TTL:
+            del _GLOBAL_EMB_CACHE[key]
+            return None
+        _GLOBAL_EMB_CACHE.move_to_end(key)
+        return vector
+
+
+def _emb_cache_put(key: str, embedding: List[float]) -> None:
+    """Store an embedding, evicting the least recently used entry when full"""
+    with _EMB_CACHE_LOCK:
+        _GLOBAL_EMB_CACHE[key] = (time.monotonic(), np.asarray(embedding, dtype=np.float32))
+        _GLOBAL_EMB_CACHE.move_to_end(key)
+        while len(_GLOBAL_EMB_CACHE) > _EMB_CACHE_MAXSIZE:
+            _GLOBAL_EMB_CACHE.popitem(last=False)
+
 
 class DeepSeekLLM(LLM):
     """Custom LLM wrapper for DeepSeek API"""
     
     client: Any = None
     model: str = "deepseek-chat"
+    streaming: bool = False  # stream tokens to callbacks while generating
     
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.client = OpenAI(
-            api_key=os.getenv("DEEPSEEK_API_KEY"),
-            base_url="https://api.deepseek.com"
-        )
+        self.client = _deepseek_client()
         self.model = "deepseek-chat"
     
+    @property
+    def aclient(self) -> AsyncOpenAI:
+        """Async client for the running event loop (only valid inside a coroutine)"""
+        return _deepseek_async_client()
+    
     @property
     def _llm_type(self) -> str:
         return "deepseek"
@@ -36,6 +136,8 @@ class DeepSeekLLM(LLM):
         **kwargs: Any,
     ) -> str:
         """Call DeepSeek API with the given prompt"""
+        if self.streaming:
+            return "".join(chunk.text for chunk in self._stream(prompt, stop, run_manager, **kwargs))
         try:
             response = self.client.chat.completions.create(
                 model=self.model,
@@ -47,24 +149,100 @@ class DeepSeekLLM(LLM):
             )
             return response.choices[0].message.content
         except Exception as e:
-            return f"Error calling DeepSeek API: {str(e)}"
+            return f"{DEEPSEEK_ERROR_PREFIX}: {str(e)}"
+    
+    async def _acall(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> str:
+        """Call DeepSeek API asynchronously with the given prompt"""
+        if self.streaming:
+            return "".join([chunk.text async for chunk in self._astream(prompt, stop, run_manager, **kwargs)])
+        try:
+            response = await self.aclient.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "user", "content": prompt}
+                ],
+                stream=False,
+                **kwargs
+            )
+            return response.choices[0].message.content
+        except Exception as e:
+            return f"{DEEPSEEK_ERROR_PREFIX}: {str(e)}"
+    
+    def _stream(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> Iterator[GenerationChunk]:
+        """Stream DeepSeek completion tokens as they are generated"""
+        try:
+            stream = self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "user", "content": prompt}
+                ],
+                stream=True,
+                **kwargs
+            )
+            for part in stream:
+                if not part.choices or not part.choices[0].delta.content:
+                    continue
+                chunk = GenerationChunk(text=part.choices[0].delta.content)
+                if run_manager:
+                    run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+        except Exception as e:
+            yield GenerationChunk(text=f"{DEEPSEEK_ERROR_PREFIX}: {str(e)}")
+    
+    async def _astream(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[GenerationChunk]:
+        """Stream DeepSeek completion tokens asynchronously as they are generated"""
+        try:
+            stream = await self.aclient.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "user", "content": prompt}
+                ],
+                stream=True,
+                **kwargs
+            )
+            async for part in stream:
+                if not part.choices or not part.choices[0].delta.content:
+                    continue
+                chunk = GenerationChunk(text=part.choices[0].delta.content)
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+        except Exception as e:
+            yield GenerationChunk(text=f"{DEEPSEEK_ERROR_PREFIX}: {str(e)}")
 
 
 class DeepSeekEmbeddings(Embeddings):
     """Custom embeddings wrapper for DeepSeek API"""
     
+    caches_embeddings = True  # API results go through the shared _GLOBAL_EMB_CACHE
+    
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.client = OpenAI(
-            api_key=os.getenv("DEEPSEEK_API_KEY"),
-            base_url="https://api.deepseek.com"
-        )
+        self.client = _deepseek_client()
         # DeepSeek might not have embeddings endpoint, so we'll use a fallback
         # You can replace this with actual DeepSeek embeddings if available
         try:
             # Test if embeddings endpoint exists
             self.client.embeddings.create(
-                model="text-embedding-ada-002",  # Test model
+                model=EMBEDDING_MODEL,  # Test model
                 input="test"
             )
             self.has_embeddings = True
@@ -72,76 +250,118 @@ class DeepSeekEmbeddings(Embeddings):
             self.has_embeddings = False
             print("⚠️  DeepSeek embeddings not available, using simple text-based embeddings")
     
+    @property
+    def aclient(self) -> AsyncOpenAI:
+        """Async client for the running event loop (only valid inside a coroutine)"""
+        return _deepseek_async_client()
+    
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        """Embed a list of documents"""
+        """Embed a list of documents in batched requests"""
         if self.has_embeddings:
             try:
-                embeddings = []
-                for text in texts:
+                keys, embeddings, missing = self._partition_cached(texts)
+                for start in range(0, len(missing), EMBEDDING_BATCH_SIZE):
+                    batch = missing[start:start + EMBEDDING_BATCH_SIZE]
                     response = self.client.embeddings.create(
-                        model="text-embedding-ada-002",
-                        input=text
+                        model=EMBEDDING_MODEL,
+                        input=[texts[i] for i in batch]
+                    )
+                    self._store_batch(batch, response, keys, embeddings)
+                return embeddings
+            except Exception as e:
+                print(f"Error with DeepSeek embeddings: {e}")
+                return self._fallback_embeddings(texts).tolist()
+        else:
+            return self._fallback_embeddings(texts).tolist()
+    
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed a list of documents, sending all batches concurrently"""
+        if self.has_embeddings:
+            try:
+                keys, embeddings, missing = self._partition_cached(texts)
+                batches = [
+                    missing[start:start + EMBEDDING_BATCH_SIZE]
+                    for start in range(0, len(missing), EMBEDDING_BATCH_SIZE)
+                ]
+                responses = await asyncio.gather(*(
+                    self.aclient.embeddings.create(
+                        model=EMBEDDING_MODEL,
+                        input=[texts[i] for i in batch]
                     )
-                    embeddings.append(response.data[0].embedding)
+                    for batch in batches
+                ))
+                for batch, response in zip(batches, responses):
+                    self._store_batch(batch, response, keys, embeddings)
                 return embeddings
             except Exception as e:
                 print(f"Error with DeepSeek embeddings: {e}")
-                return self._fallback_embeddings(texts)
+                return self._fallback_embeddings(texts).tolist()
         else:
-            return self._fallback_embeddings(texts)
+            return self._fallback_embeddings(texts).tolist()
+    
+    def _partition_cached(self, texts: List[str]):
+        """Return cache keys, embeddings found in the cache, and indices still to embed"""
+        keys = [_emb_cache_key(text) for text in texts]
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        missing = []
+        for i, key in enumerate(keys):
+            cached = _emb_cache_get(key)
+            if cached is None:
+                missing.append(i)
+            else:
+                embeddings[i] = cached.tolist()
+        return keys, embeddings, missing
+    
+    def _store_batch(self, batch, response, keys, embeddings) -> None:
+        """Place a batch response into its original positions and cache it"""
+        for i, item in zip(batch, sorted(response.data, key=lambda d: d.index)):
+            embeddings[i] = item.embedding
+            _emb_cache_put(keys[i], item.embedding)
     
     def embed_query(self, text: str) -> List[float]:
-        """Embed a single query"""
+        """Embed a single query (repeat queries are served from the shared cache)"""
         if self.has_embeddings:
+            key = _emb_cache_key(text)
+            cached = _emb_cache_get(key)
+            if cached is not None:
+                return cached.tolist()
             try:
                 response = self.client.embeddings.create(
-                    model="text-embedding-ada-002",
+                    model=EMBEDDING_MODEL,
                     input=text
                 )
-                return response.data[0].embedding
+                embedding = response.data[0].embedding
+                _emb_cache_put(key, embedding)
+                return embedding
             except Exception as e:
                 print(f"Error with DeepSeek embeddings: {e}")
-                return self._fallback_embedding(text)
+                return self._fallback_embedding(text).tolist()
         else:
-            return self._fallback_embedding(text)
+            return self._fallback_embedding(text).tolist()
     
-    def _fallback_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """Simple fallback embeddings based on text characteristics"""
-        embeddings = []
-        for text in texts:
-            embeddings.append(self._fallback_embedding(text))
-        return embeddings
-    
-    def _fallback_embedding(self, text: str) -> List[float]:
-        """Create a simple embedding based on text characteristics"""
+    def _fallback_embeddings(self, texts: List[str]) -> np.ndarray:
+        """Simple fallback embeddings based on text characteristics, shape (len(texts), 384)"""
         # This is a very basic fallback - in production you'd want to use
         # a proper embedding model like sentence-transformers
-        words = text.lower().split()
+        # Features are filled column by column (one vectorized pass per feature)
+        n = len(texts)
+        lowered = np.char.lower(np.asarray(texts, dtype=np.str_))
+        words = [text.split() for text in lowered.tolist()]
         
-        # Create a 384-dimensional vector based on text features
-        features = [
-            len(text),
-            len(words),
-            len(set(words)),  # unique words
-            text.count('.'),
-            text.count(','),
-            text.count('python'),
-            text.count('javascript'),
-            text.count('experience'),
-            text.count('skills'),
-            text.count('project'),
-        ]
-        
-        # Pad or truncate to 384 dimensions
-        embedding = features + [0.0] * (384 - len(features))
-        embedding = embedding[:384]
+        embeddings = np.zeros((n, FALLBACK_EMBEDDING_DIM), dtype=np.float32)
+        embeddings[:, 0] = np.char.str_len(lowered)
+        embeddings[:, 1] = np.fromiter((len(w) for w in words), dtype=np.float32, count=n)
+        embeddings[:, 2] = np.fromiter((len(set(w)) for w in words), dtype=np.float32, count=n)  # unique words
+        for column, keyword in enumerate(FALLBACK_KEYWORDS, start=3):
+            embeddings[:, column] = np.char.count(lowered, keyword)
         
         # Normalize
-        norm = np.linalg.norm(embedding)
-        if norm > 0:
-            embedding = [x / norm for x in embedding]
-        
-        return embedding
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True).clip(min=1e-12)
+        return embeddings
+    
+    def _fallback_embedding(self, text: str) -> np.ndarray:
+        """Create a simple embedding based on text characteristics"""
+        return self._fallback_embeddings([text])[0]
 
 
 def get_deepseek_llm(**kwargs) -> DeepSeekLLM:
@@ -1,7 +1,14 @@
+import os
+import functools
+import threading
+from collections import OrderedDict
 from langchain.chains import RetrievalQA, LLMChain
 from langchain.prompts import PromptTemplate
 from .vector_service import load_faiss_index
-from .deepseek_service import get_deepseek_llm
+from .resume_service import file_digest
+from .deepseek_service import get_deepseek_llm, DEEPSEEK_ERROR_PREFIX
+from .semantic_cache import SemanticCache
+from .streaming import ChainTokenStream
 
 try:
     from langchain_openai import OpenAI
@@ -27,34 +34,181 @@ INTERVIEW_PROMPT = PromptTemplate.from_template(
     "You are an interviewer. Based on my résumé, simulate 5 interview questions for a {role} role."
 )
 
+# Generated text keyed on (kind, input); shared by the sync and async generators
+_GENERATION_CACHE: "OrderedDict[tuple, str]" = OrderedDict()
+_GENERATION_CACHE_LOCK = threading.Lock()
+_GENERATION_CACHE_SIZE = 256
 
-def get_llm():
+
+def _cached_generation(key: tuple):
+    with _GENERATION_CACHE_LOCK:
+        text = _GENERATION_CACHE.get(key)
+        if text is not None:
+            _GENERATION_CACHE.move_to_end(key)
+        return text
+
+
+def _store_generation(key: tuple, text: str) -> str:
+    """Cache a generated text (API errors are not cached) and return it"""
+    if not text.startswith(DEEPSEEK_ERROR_PREFIX):
+        with _GENERATION_CACHE_LOCK:
+            _GENERATION_CACHE[key] = text
+            _GENERATION_CACHE.move_to_end(key)
+            while len(_GENERATION_CACHE) > _GENERATION_CACHE_SIZE:
+                _GENERATION_CACHE.popitem(last=False)
+    return text
+
+
+def get_llm(streaming: bool = False):
     """Get the appropriate LLM instance (DeepSeek preferred, OpenAI fallback)"""
     try:
-        return get_deepseek_llm()
+        return get_deepseek_llm(streaming=streaming)
     except Exception as e:
         print(f"⚠️  DeepSeek not available ({e}), falling back to OpenAI")
-        return OpenAI()
+        return OpenAI(streaming=streaming) if USE_OPENAI else OpenAI()
 
 
-def answer_query(question: str):
-    import os
-    # Ensure we're using the correct path
-    index_path = os.path.join(os.path.dirname(__file__), "..", "..", "data", "vector_store", "faiss_index")
-    index_path = os.path.abspath(index_path)
-    
-    store = load_faiss_index(index_path)
-    qa = RetrievalQA.from_chain_type(
+# Chains are built on first use and reused; call .cache_clear() to rebind a new LLM
+@functools.lru_cache(maxsize=1)
+def _cover_chain():
+    # Cover letters are long, so stream them (see astream_cover_letter)
+    return LLMChain(llm=get_llm(streaming=True), prompt=COVER_LETTER_PROMPT)
+
+
+@functools.lru_cache(maxsize=1)
+def _interview_chain():
+    return LLMChain(llm=get_llm(), prompt=INTERVIEW_PROMPT)
+
+
+INDEX_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "data", "vector_store", "faiss_index")
+)
+
+
+@functools.lru_cache(maxsize=4)
+def _get_store(index_path: str):
+    """Load a FAISS index once and reuse it across queries"""
+    return load_faiss_index(index_path)
+
+
+def clear_store_cache():
+    """Drop cached FAISS indexes and their answer cache (call after the index is rebuilt)"""
+    _get_store.cache_clear()
+    _answer_cache.cache_clear()
+
+
+# Answers to near-duplicate questions persist next to the index they were answered from
+ANSWER_CACHE_PATH = INDEX_PATH + ".answers.pkl"
+ANSWER_CACHE_THRESHOLD = 0.92
+ANSWER_CACHE_TTL = 7 * 24 * 3600  # seconds
+
+
+@functools.lru_cache(maxsize=1)
+def _answer_cache():
+    """(SemanticCache, index digest) for INDEX_PATH; the cache is None without real embeddings"""
+    cache = SemanticCache.for_vector_store(
+        _get_store(INDEX_PATH), threshold=ANSWER_CACHE_THRESHOLD, ttl=ANSWER_CACHE_TTL
+    )
+    # Answers saved for a different index are discarded
+    tag = file_digest(os.path.join(INDEX_PATH, "index.faiss")).hexdigest()
+    if cache is not None:
+        cache.load(ANSWER_CACHE_PATH, tag)
+    return cache, tag
+
+
+def _remember_answer(cache, tag, vector, answer: str) -> str:
+    if not answer.startswith(DEEPSEEK_ERROR_PREFIX):
+        cache.add(vector, answer)
+        cache.save(ANSWER_CACHE_PATH, tag)
+    return answer
+
+
+def _qa_chain():
+    store = _get_store(INDEX_PATH)
+    return RetrievalQA.from_chain_type(
         llm=get_llm(), chain_type="stuff", retriever=store.as_retriever()
     )
-    return qa.run(question)
+
+
+def answer_query(question: str):
+    return _qa_chain().run(question)
+
+
+async def aanswer_query(question: str):
+    qa = _qa_chain()
+    result = await qa.ainvoke({qa.input_key: question})
+    return result[qa.output_key]
+
+
+def cached_answer_query(question: str, no_cache: bool = False):
+    """answer_query, served from the semantic answer cache for near-duplicate questions"""
+    cache, tag = (None, None) if no_cache else _answer_cache()
+    if cache is None:
+        return answer_query(question)
+    vector = cache.embed(question)
+    cached = cache.lookup(vector)
+    if cached is not None:
+        return cached
+    return _remember_answer(cache, tag, vector, answer_query(question))
+
+
+async def acached_answer_query(question: str, no_cache: bool = False):
+    """aanswer_query, served from the semantic answer cache for near-duplicate questions"""
+    cache, tag = (None, None) if no_cache else _answer_cache()
+    if cache is None:
+        return await aanswer_query(question)
+    vector = await cache.aembed(question)
+    cached = cache.lookup(vector)
+    if cached is not None:
+        return cached
+    return _remember_answer(cache, tag, vector, await aanswer_query(question))
 
 
 def gen_cover_letter(job_desc: str):
-    chain = LLMChain(llm=get_llm(), prompt=COVER_LETTER_PROMPT)
-    return chain.run(job_desc)
+    key = ("cover_letter", job_desc)
+    cached = _cached_generation(key)
+    if cached is not None:
+        return cached
+    return _store_generation(key, _cover_chain().run(job_desc))
 
 
 def gen_interview_questions(role: str):
-    chain = LLMChain(llm=get_llm(), prompt=INTERVIEW_PROMPT)
-    return chain.run(role)
+    key = ("interview", role)
+    cached = _cached_generation(key)
+    if cached is not None:
+        return cached
+    return _store_generation(key, _interview_chain().run(role))
+
+
+async def agen_cover_letter(job_desc: str):
+    key = ("cover_letter", job_desc)
+    cached = _cached_generation(key)
+    if cached is not None:
+        return cached
+    chain = _cover_chain()
+    result = await chain.ainvoke({"job_desc": job_desc})
+    return _store_generation(key, result[chain.output_key])
+
+
+async def agen_interview_questions(role: str):
+    key = ("interview", role)
+    cached = _cached_generation(key)
+    if cached is not None:
+        return cached
+    chain = _interview_chain()
+    result = await chain.ainvoke({"role": role})
+    return _store_generation(key, result[chain.output_key])
+
+
+async def astream_cover_letter(job_desc: str):
+    """Yield cover letter tokens as they are generated (cached letters are yielded whole)"""
+    key = ("cover_letter", job_desc)
+    cached = _cached_generation(key)
+    if cached is not None:
+        yield cached
+        return
+    chain = _cover_chain()
+    stream = ChainTokenStream(chain, {"job_desc": job_desc}, output_key=chain.output_key)
+    async for token in stream:
+        yield token
+    _store_generation(key, stream.result[chain.output_key])
@@ -1,59 +1,99 @@
 # backend/services/rag_service.py
+import asyncio
+import threading
+import weakref
+from typing import List
 from langchain.chains import RetrievalQA
 from langchain_community.chat_models import ChatOpenAI
 from langchain.prompts import PromptTemplate
-from .deepseek_service import get_deepseek_llm
+from langchain.schema import Document
+from .deepseek_service import get_deepseek_llm, DEEPSEEK_ERROR_PREFIX
+from .semantic_cache import SemanticCache
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Upper bound on concurrent LLM calls from one RAGService
+MAX_CONCURRENT_LLM_CALLS = 32
+
+# Read once at import rather than on every RAGService construction
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+
+# Custom prompt for resume Q&A
+_QA_PROMPT = PromptTemplate(
+    template="""You are a helpful assistant analyzing a resume. Use the following context to answer questions about the person's experience, skills, and background.
+
+Context from resume:
+{context}
+
+Question: {question}
+
+Instructions:
+- Answer based ONLY on the provided resume content
+- If information isn't in the resume, say "This information is not available in the resume"
+- Be specific and cite relevant experience when possible
+- Keep responses concise but informative
+
+Answer:""",
+    input_variables=["context", "question"]
+)
+
+class RAGResponse:
+    """Answer to a resume question; source chunk texts are only extracted when read"""
+    __slots__ = ("question", "answer", "source_documents")
+    
+    def __init__(self, question: str, answer: str, source_documents: List[Document]):
+        self.question = question
+        self.answer = answer
+        self.source_documents = source_documents
+    
+    @property
+    def source_chunks(self) -> List[str]:
+        return [doc.page_content for doc in self.source_documents]
+    
+    def to_dict(self) -> dict:
+        """Plain dict form ({question, answer, source_chunks}), e.g. for JSON responses"""
+        return {"question": self.question, "answer": self.answer, "source_chunks": self.source_chunks}
+
 class RAGService:
+    __slots__ = ("llm", "vector_store", "tau", "sem_cache", "_llm_sems", "_llm_sems_lock", "qa_chain")
+    
     def __init__(self, vector_store):
         # Try DeepSeek first, fallback to OpenAI
         try:
-            self.llm = get_deepseek_llm()
+            self.llm = get_deepseek_llm(streaming=True)
             print("✅ Using DeepSeek LLM")
         except Exception as e:
             print(f"⚠️  DeepSeek not available ({e}), falling back to OpenAI")
             self.llm = ChatOpenAI(
                 temperature=0.7,
                 model="gpt-3.5-turbo",
-                openai_api_key=os.getenv("OPENAI_API_KEY")
+                openai_api_key=OPENAI_API_KEY,
+                streaming=True
             )
         self.vector_store = vector_store
+        self.tau = SEMANTIC_CACHE_THRESHOLD
+        self.sem_cache = SemanticCache.for_vector_store(vector_store, threshold=self.tau)
+        # One semaphore per event loop, created inside it (on Python < 3.10 a semaphore
+        # binds to the loop current at construction)
+        self._llm_sems = weakref.WeakKeyDictionary()
+        self._llm_sems_lock = threading.Lock()
         self.setup_qa_chain()
     
     def setup_qa_chain(self):
         """Initialize the QA chain with custom prompt"""
-        # Custom prompt for resume Q&A
-        qa_prompt = PromptTemplate(
-            template="""You are a helpful assistant analyzing a resume. Use the following context to answer questions about the person's experience, skills, and background.
-
-Context from resume:
-{context}
-
-Question: {question}
-
-Instructions:
-- Answer based ONLY on the provided resume content
-- If information isn't in the resume, say "This information is not available in the resume"
-- Be specific and cite relevant experience when possible
-- Keep responses concise but informative
-
-Answer:""",
-            input_variables=["context", "question"]
-        )
-        
         # Create retrieval chain
         self.qa_chain = RetrievalQA.from_chain_type(
             llm=self.llm,
             chain_type="stuff",
             retriever=self.vector_store.as_retriever(
-                search_type="similarity",
-                search_kwargs={"k": 4}  # Retrieve top 4 relevant chunks
+                # Pick 3 diverse chunks from the top 8; overlapping neighbours waste prompt tokens
+                search_type="mmr",
+                search_kwargs={"k": 3, "fetch_k": 8, "lambda_mult": 0.5}
             ),
-            chain_type_kwargs={"prompt": qa_prompt},
+            chain_type_kwargs={"prompt": _QA_PROMPT},
             return_source_documents=True
         )
         print("✅ RAG QA Chain initialized!")
@@ -64,20 +104,99 @@ Answer:""",
             raise ValueError("QA chain not initialized")
         
         print(f"❓ Question: {question}")
+        
+        # Serve near-duplicate questions from the semantic cache
+        q_vec = None
+        if self.sem_cache is not None:
+            q_vec = self.sem_cache.embed(question)
+            cached = self._cached_response(question, q_vec)
+            if cached is not None:
+                return cached
+        
         result = self.qa_chain({"query": question})
+        return self._build_response(question, result, q_vec)
+    
+    async def aask_question(self, question: str):
+        """Ask a question about the resume without blocking the event loop"""
+        if not self.qa_chain:
+            raise ValueError("QA chain not initialized")
+        
+        print(f"❓ Question: {question}")
         
-        response = {
-            "question": question,
-            "answer": result["result"],
-            "source_chunks": [doc.page_content for doc in result["source_documents"]]
-        }
+        q_vec = None
+        if self.sem_cache is not None:
+            q_vec = await self.sem_cache.aembed(question)
+            cached = self._cached_response(question, q_vec)
+            if cached is not None:
+                return cached
         
-        print(f"💬 Answer: {response['answer']}")
+        async with self._llm_semaphore():
+            result = await self.qa_chain.ainvoke({"query": question})
+        return self._build_response(question, result, q_vec)
+    
+    def _llm_semaphore(self) -> asyncio.Semaphore:
+        """Return the LLM call semaphore for the running event loop, creating it on first use"""
+        loop = asyncio.get_running_loop()
+        with self._llm_sems_lock:
+            sem = self._llm_sems.get(loop)
+            if sem is None:
+                sem = asyncio.Semaphore(MAX_CONCURRENT_LLM_CALLS)
+                self._llm_sems[loop] = sem
+            return sem
+    
+    def _cached_response(self, question, q_vec):
+        """Return the cached response for a near-duplicate question, if any"""
+        cached = self.sem_cache.lookup(q_vec)
+        if cached is None:
+            return None
+        print("⚡ Semantic cache hit")
+        answer, source_documents = cached
+        return RAGResponse(question, answer, source_documents)
+    
+    def _build_response(self, question, result, q_vec):
+        """Wrap a chain result and add it to the semantic cache"""
+        response = RAGResponse(question, result["result"], result["source_documents"])
+        
+        # API failures are not cached, or they would answer every similar question
+        if q_vec is not None and not response.answer.startswith(DEEPSEEK_ERROR_PREFIX):
+            self.sem_cache.add(q_vec, (response.answer, response.source_documents))
+        
+        print(f"💬 Answer: {response.answer}")
         return response
     
     def generate_cover_letter(self, job_description: str):
         """Generate a cover letter based on resume and job description"""
-        cover_letter_prompt = f"""
+        result = self.qa_chain({"query": self._cover_letter_query(job_description)})
+        return result["result"]
+    
+    async def agenerate_cover_letter(self, job_description: str):
+        """Generate a cover letter without blocking the event loop"""
+        async with self._llm_semaphore():
+            result = await self.qa_chain.ainvoke({"query": self._cover_letter_query(job_description)})
+        return result["result"]
+    
+    def get_interview_prep(self, job_description: str):
+        """Generate interview preparation based on resume and job"""
+        result = self.qa_chain({"query": self._interview_prep_query(job_description)})
+        return result["result"]
+    
+    async def aget_interview_prep(self, job_description: str):
+        """Generate interview preparation without blocking the event loop"""
+        async with self._llm_semaphore():
+            result = await self.qa_chain.ainvoke({"query": self._interview_prep_query(job_description)})
+        return result["result"]
+    
+    async def prep_bundle(self, job_description: str):
+        """Generate the cover letter and interview prep for a job concurrently"""
+        cover_letter, interview_prep = await asyncio.gather(
+            self.agenerate_cover_letter(job_description),
+            self.aget_interview_prep(job_description)
+        )
+        return {"cover_letter": cover_letter, "interview_prep": interview_prep}
+    
+    @staticmethod
+    def _cover_letter_query(job_description: str):
+        return f"""
         Based on the resume context provided, write a professional cover letter for this job:
         
         Job Description: {job_description}
@@ -88,13 +207,10 @@ Answer:""",
         - Be professional and engaging
         - Be 3-4 paragraphs long
         """
-        
-        result = self.qa_chain({"query": cover_letter_prompt})
-        return result["result"]
     
-    def get_interview_prep(self, job_description: str):
-        """Generate interview preparation based on resume and job"""
-        interview_prompt = f"""
+    @staticmethod
+    def _interview_prep_query(job_description: str):
+        return f"""
         Based on the resume context, prepare for this job interview:
         
         Job Description: {job_description}
@@ -106,22 +222,13 @@ Answer:""",
         
         Format your response clearly with numbered sections.
         """
-        
-        result = self.qa_chain({"query": interview_prompt})
-        return result["result"]
 
 # Complete RAG system test
 if __name__ == "__main__":
-    from resume_service import ResumeProcessor
-    from vector_service import VectorService
+    from vector_service import get_or_build_index
     
-    # 1. Load and process resume
-    processor = ResumeProcessor()
-    chunks = processor.load_resume("sample_resume.pdf")
-    
-    # 2. Create vector store
-    vector_service = VectorService()
-    vector_store = vector_service.create_vector_store(chunks)
+    # 1-2. Load the resume's vector store (built and saved on first run)
+    vector_store = get_or_build_index("sample_resume.pdf")
     
     # 3. Initialize RAG
     rag = RAGService(vector_store)
@@ -134,8 +241,11 @@ if __name__ == "__main__":
         "What are their key skills?"
     ]
     
-    for question in test_questions:
-        response = rag.ask_question(question)
+    # The questions are independent, so ask them concurrently (bounded by MAX_CONCURRENT_LLM_CALLS)
+    async def ask_all():
+        return await asyncio.gather(*(rag.aask_question(q) for q in test_questions))
+    
+    for question, response in zip(test_questions, asyncio.run(ask_all())):
         print(f"\nQ: {question}")
-        print(f"A: {response['answer']}")
+        print(f"A: {response.answer}")
         print("-" * 50)
\ No newline at end of file
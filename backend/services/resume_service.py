@@ -2,43 +2,166 @@
 from langchain_community.document_loaders import PyPDFLoader, Docx2txtLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document
+import io
 import os
+import pickle
+import hashlib
+import tempfile
+from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    # Rust splitter; much faster than the pure-Python recursive splitter
+    from semantic_text_splitter import TextSplitter
+    USE_SEMANTIC_SPLITTER = True
+except ImportError:
+    USE_SEMANTIC_SPLITTER = False
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
+# Chunked resumes are cached here, keyed by file content (set cache_dir=None to disable)
+CHUNK_CACHE_DIR = "data/chunk_cache"
+
+# PDFs with at least this many pages have their text extracted by a process pool
+PARALLEL_PDF_MIN_PAGES = 4
+
+def _pdf_reader(source):
+    """pypdf reader for a file path or the PDF's bytes"""
+    import pypdf
+    return pypdf.PdfReader(source if isinstance(source, str) else io.BytesIO(source))
+
+def _extract_page_range(args):
+    """Text of pages [start, stop) of a PDF; runs in a worker, so it opens the file itself"""
+    source, start, stop = args
+    pages = _pdf_reader(source).pages
+    return [pages[i].extract_text() for i in range(start, stop)]
+
+def _load_pdf_pages(file_path: str, data=None):
+    """PDF pages as Documents, extracted in parallel for longer files
+    
+    data, if given, is the PDF's content and is parsed in memory instead of reading file_path.
+    """
+    source = file_path if data is None else data
+    num_pages = len(_pdf_reader(source).pages)
+    if num_pages < PARALLEL_PDF_MIN_PAGES:
+        if data is None:
+            # Pages are parsed one at a time, so only one page is held before splitting
+            return PyPDFLoader(file_path).lazy_load()
+        texts = _extract_page_range((source, 0, num_pages))
+    else:
+        # Each worker takes a contiguous page range; results come back in page order
+        workers = min(os.cpu_count() or 1, num_pages)
+        ranges = [(source, num_pages * i // workers, num_pages * (i + 1) // workers) for i in range(workers)]
+        with ProcessPoolExecutor(workers) as pool:
+            texts = [text for part in pool.map(_extract_page_range, ranges) for text in part]
+    return [
+        Document(page_content=text, metadata={"source": file_path, "page": page})
+        for page, text in enumerate(texts)
+    ]
+
+def file_digest(file_path: str):
+    """sha256 hash object of a file's content, read in 1 MB blocks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest
 
 class ResumeProcessor:
-    def __init__(self):
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len,
-            separators=["\n\n", "\n", " ", ""]
-        )
+    def __init__(self, cache_dir=CHUNK_CACHE_DIR):
+        self.cache_dir = cache_dir
+        if USE_SEMANTIC_SPLITTER:
+            self.text_splitter = TextSplitter(CHUNK_SIZE, overlap=CHUNK_OVERLAP)
+        else:
+            self.text_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=CHUNK_SIZE,
+                chunk_overlap=CHUNK_OVERLAP,
+                length_function=len,
+                separators=["\n\n", "\n", " ", ""]
+            )
     
-    def load_resume(self, file_path: str):
-        """Load and chunk resume from PDF, DOCX, or TXT"""
-        if not os.path.exists(file_path):
+    def load_resume(self, file_path: str, data: Optional[bytes] = None):
+        """Load and chunk resume from PDF, DOCX, or TXT
+        
+        Pass data (e.g. an upload's bytes) to parse it in memory; file_path then only
+        names the file, giving its type and the chunks' source.
+        """
+        if data is None and not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
         
+        cache_path = self._cache_path(file_path, data) if self.cache_dir else None
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, 'rb') as f:
+                chunked_docs = pickle.load(f)
+            # Same content may have been uploaded under a different name
+            for doc in chunked_docs:
+                doc.metadata["source"] = file_path
+            print(f"⚡ Loaded {len(chunked_docs)} cached chunks for {os.path.basename(file_path)}")
+            return chunked_docs
+        
         # Determine file type and use appropriate loader
         if file_path.lower().endswith('.pdf'):
-            loader = PyPDFLoader(file_path)
-            documents = loader.load()
+            documents = _load_pdf_pages(file_path, data)
         elif file_path.lower().endswith(('.docx', '.doc')):
-            loader = Docx2txtLoader(file_path)
-            documents = loader.load()
+            if data is None:
+                loader = Docx2txtLoader(file_path)
+                documents = loader.lazy_load()
+            else:
+                import docx2txt
+                content = docx2txt.process(io.BytesIO(data))
+                documents = [Document(page_content=content, metadata={"source": file_path})]
         elif file_path.lower().endswith('.txt'):
             # Handle plain text files
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            if data is None:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    content = f.read()
+            else:
+                content = data.decode('utf-8')
             documents = [Document(page_content=content, metadata={"source": file_path})]
         else:
             raise ValueError("Unsupported file type. Use PDF, DOCX, or TXT.")
         
-        # Load and split documents
-        chunked_docs = self.text_splitter.split_documents(documents)
+        # Load and split documents page by page
+        chunked_docs = []
+        num_pages = 0
+        for page in documents:
+            chunked_docs.extend(self.split_documents([page]))
+            num_pages += 1
         
-        print(f"✅ Loaded {len(documents)} pages, split into {len(chunked_docs)} chunks")
+        print(f"✅ Loaded {num_pages} pages, split into {len(chunked_docs)} chunks")
+        
+        if cache_path:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Write a uniquely named file then rename, so a concurrent reader never sees
+            # a partial pickle and concurrent writers never share a temp file
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(chunked_docs, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, cache_path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
         return chunked_docs
     
+    def split_documents(self, documents):
+        """Split documents into chunks, keeping each document's metadata"""
+        if not USE_SEMANTIC_SPLITTER:
+            return self.text_splitter.split_documents(documents)
+        return [
+            Document(page_content=chunk, metadata=dict(doc.metadata))
+            for doc in documents
+            for chunk in self.text_splitter.chunks(doc.page_content)
+        ]
+    
+    def _cache_path(self, file_path: str, data: Optional[bytes] = None):
+        """Chunk cache file for this file's content and the splitter settings"""
+        digest = file_digest(file_path) if data is None else hashlib.sha256(data)
+        splitter = type(self.text_splitter).__name__
+        digest.update(f"{os.path.splitext(file_path)[1].lower()}:{splitter}:{CHUNK_SIZE}:{CHUNK_OVERLAP}".encode())
+        return os.path.join(self.cache_dir, f"{digest.hexdigest()}.pkl")
+    
     def preview_chunks(self, chunks, num_preview=3):
         """Preview first few chunks for debugging"""
         for i, chunk in enumerate(chunks[:num_preview]):
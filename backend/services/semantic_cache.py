@@ -0,0 +1,140 @@
+# backend/services/semantic_cache.py
+import os
+import time
+import pickle
+import tempfile
+import threading
+import numpy as np
+from typing import Any, List, Optional
+
+# Unit vectors are stored as int8 codes: component ~= code / INT8_LEVELS
+INT8_LEVELS = 127
+
+
+class SemanticCache:
+    """Similarity cache mapping query embeddings to previously computed responses"""
+
+    def __init__(self, embeddings, threshold: float = 0.95, max_entries: int = 256, ttl: Optional[float] = None):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl  # seconds an entry stays servable (None: forever)
+        self._lock = threading.Lock()
+        self._codes: Optional[np.ndarray] = None  # (max_entries, dim) int8-quantized unit vectors
+        self._values: List[Any] = []
+        self._last_used = np.zeros(max_entries, dtype=np.int64)
+        self._added_at = np.zeros(max_entries, dtype=np.float64)
+        self._clock = 0
+
+    @classmethod
+    def for_vector_store(cls, vector_store, **kwargs) -> Optional["SemanticCache"]:
+        """Create a cache using the store's embeddings, or None if they are not a real model"""
+        embeddings = getattr(vector_store, "embeddings", None)
+        # Text-statistics fallback embeddings make unrelated questions look alike
+        if embeddings is None or not getattr(embeddings, "has_embeddings", True):
+            return None
+        return cls(embeddings, **kwargs)
+
+    def __len__(self):
+        return len(self._values)
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embed and L2-normalize a query"""
+        return self._normalize(self.embeddings.embed_query(text))
+
+    async def aembed(self, text: str) -> np.ndarray:
+        """Embed and L2-normalize a query asynchronously"""
+        return self._normalize(await self.embeddings.aembed_query(text))
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    @staticmethod
+    def _quantize(vector: np.ndarray) -> np.ndarray:
+        return np.clip(np.round(vector * INT8_LEVELS), -INT8_LEVELS, INT8_LEVELS).astype(np.int8)
+
+    def lookup(self, vector: np.ndarray) -> Optional[Any]:
+        """Return the cached value for the most similar query above the threshold"""
+        with self._lock:
+            if not self._values or vector.shape[0] != self._codes.shape[1]:
+                return None
+            # int8 x int8 dot products accumulated in int32, then rescaled to cosine
+            codes = self._codes[:len(self._values)].astype(np.int32)
+            scores = (codes @ self._quantize(vector).astype(np.int32)) / INT8_LEVELS ** 2
+            if self.ttl is not None:
+                scores[self._added_at[:len(self._values)] < time.time() - self.ttl] = -np.inf
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None
+            self._clock += 1
+            self._last_used[best] = self._clock
+            return self._values[best]
+
+    def add(self, vector: np.ndarray, value: Any) -> None:
+        """Insert a response, evicting the least recently used entry when full"""
+        with self._lock:
+            if self._codes is None or vector.shape[0] != self._codes.shape[1]:
+                self._codes = np.zeros((self.max_entries, vector.shape[0]), dtype=np.int8)
+                self._values = []
+            if len(self._values) < self.max_entries:
+                slot = len(self._values)
+                self._values.append(value)
+            else:
+                slot = int(np.argmin(self._last_used))
+                self._values[slot] = value
+            self._codes[slot] = self._quantize(vector)
+            self._added_at[slot] = time.time()
+            self._clock += 1
+            self._last_used[slot] = self._clock
+
+    def clear(self) -> None:
+        """Drop every cached response"""
+        with self._lock:
+            self._codes = None
+            self._values = []
+            self._last_used[:] = 0
+            self._added_at[:] = 0
+            self._clock = 0
+    
+    def save(self, path: str, tag: Any = None) -> None:
+        """Write the cache to disk; tag (e.g. an index digest) must match on load"""
+        with self._lock:
+            state = {
+                "tag": tag,
+                "codes": self._codes,
+                "values": list(self._values),
+                "last_used": self._last_used.copy(),
+                "added_at": self._added_at.copy(),
+                "clock": self._clock,
+            }
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # Write a uniquely named file then rename, so a concurrent reader never sees
+        # a partial pickle and concurrent saves never share a temp file
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    
+    def load(self, path: str, tag: Any = None) -> bool:
+        """Restore entries saved with the same tag and max_entries; returns whether it did"""
+        if not os.path.exists(path):
+            return False
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        if state["tag"] != tag or len(state["last_used"]) != self.max_entries:
+            return False
+        with self._lock:
+            self._codes = state["codes"]
+            self._values = state["values"]
+            self._last_used = state["last_used"]
+            self._added_at = state["added_at"]
+            self._clock = state["clock"]
+        return True
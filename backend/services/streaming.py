@@ -0,0 +1,48 @@
+# backend/services/streaming.py
+import asyncio
+from langchain.callbacks.base import AsyncCallbackHandler
+
+_DONE = object()
+
+
+class _TokenQueueHandler(AsyncCallbackHandler):
+    """Callback handler that forwards streamed LLM tokens to a queue"""
+
+    def __init__(self, queue: asyncio.Queue):
+        self.queue = queue
+
+    async def on_llm_new_token(self, token: str, **kwargs) -> None:
+        if token:
+            self.queue.put_nowait(token)
+
+
+class ChainTokenStream:
+    """Run a chain and iterate over the LLM tokens it streams
+
+    The chain output is available as ``result`` once iteration finishes. If the
+    LLM does not stream, the final ``output_key`` value is yielded as one token.
+    """
+
+    def __init__(self, chain, inputs: dict, output_key: str):
+        self.chain = chain
+        self.inputs = inputs
+        self.output_key = output_key
+        self.result = None
+
+    async def __aiter__(self):
+        queue: asyncio.Queue = asyncio.Queue()
+        task = asyncio.ensure_future(
+            self.chain.ainvoke(self.inputs, config={"callbacks": [_TokenQueueHandler(queue)]})
+        )
+        task.add_done_callback(lambda _: queue.put_nowait(_DONE))
+        streamed = False
+        try:
+            while (token := await queue.get()) is not _DONE:
+                streamed = True
+                yield token
+            self.result = await task
+        finally:
+            if not task.done():
+                task.cancel()
+        if not streamed:
+            yield self.result[self.output_key]
@@ -1,23 +1,201 @@
 # backend/services/vector_service.py
 from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.embeddings import OpenAIEmbeddings
-from .deepseek_service import get_deepseek_embeddings
+from .deepseek_service import get_deepseek_embeddings, EMBEDDING_BATCH_SIZE
+from .cached_embeddings import CachedEmbeddings
+from .resume_service import ResumeProcessor, file_digest
 import os
+import hashlib
+import pickle
+import tempfile
+import functools
+import faiss
+import numpy as np
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Index used for new vector stores: "flat" (exact search), "hnsw" (approximate, O(log N) search)
+# "ivfpq" (inverted lists + product quantization, ~M bytes per vector), or exact search over
+# scalar-quantized vectors: "fp16" (2 bytes per dimension) or "sq8" (1 byte per dimension)
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat").lower()
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+IVFPQ_MIN_VECTORS = 4096  # smaller corpora can't train the quantizers well, so use flat
+IVFPQ_MAX_NLIST = 64
+IVFPQ_M = 16  # sub-quantizers (bytes per vector); must divide the embedding dimension
+IVFPQ_NBITS = 8
+IVFPQ_NPROBE = 8
+SCALAR_QUANTIZERS = {
+    "fp16": faiss.ScalarQuantizer.QT_fp16,
+    "sq8": faiss.ScalarQuantizer.QT_8bit,
+}
+SQ8_MIN_VECTORS = 10_000  # below this exact flat search is cheap, so skip training the ranges
+# Trained (still empty) indexes are saved here and reused by later builds of the same type and dimension
+QUANTIZER_DIR = os.getenv("FAISS_QUANTIZER_DIR", "data/vector_store")
+
+
+class CosineFAISS(FAISS):
+    """FAISS store over unit-length vectors, so inner product is cosine similarity
+    
+    Queries and added texts are normalized here, which covers every search path
+    (including MMR, which skips the base class's normalize_L2 handling).
+    """
+    
+    def __init__(self, embedding_function, index, docstore, index_to_docstore_id, **kwargs):
+        kwargs["distance_strategy"] = DistanceStrategy.MAX_INNER_PRODUCT
+        super().__init__(embedding_function, index, docstore, index_to_docstore_id, **kwargs)
+    
+    def _embed_documents(self, texts):
+        return _normalized(super()._embed_documents(texts)).tolist()
+    
+    async def _aembed_documents(self, texts):
+        return _normalized(await super()._aembed_documents(texts)).tolist()
+    
+    def _embed_query(self, text):
+        return _normalized([super()._embed_query(text)])[0].tolist()
+    
+    async def _aembed_query(self, text):
+        return _normalized([await super()._aembed_query(text)])[0].tolist()
+    
+    def save_local(self, folder_path, index_name="index"):
+        """Save the index and docstore (same layout as FAISS.save_local, newest pickle protocol)"""
+        os.makedirs(folder_path, exist_ok=True)
+        faiss.write_index(self.index, os.path.join(folder_path, f"{index_name}.faiss"))
+        with open(os.path.join(folder_path, f"{index_name}.pkl"), "wb") as f:
+            pickle.dump((self.docstore, self.index_to_docstore_id), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _normalized(vectors):
+    """Return vectors as a float32 matrix of unit-length rows"""
+    matrix = np.array(vectors, dtype=np.float32)
+    faiss.normalize_L2(matrix)
+    return matrix
+
+
+def _resolve_index_type(index_type, num_vectors, dim):
+    """Fall back to a flat index when the corpus is too small for IVFPQ"""
+    if index_type == "ivfpq" and (num_vectors < IVFPQ_MIN_VECTORS or dim % IVFPQ_M):
+        print(f"ℹ️  Using flat index: IVFPQ needs {IVFPQ_MIN_VECTORS}+ vectors and a dimension divisible by {IVFPQ_M}")
+        return "flat"
+    if index_type == "sq8" and num_vectors < SQ8_MIN_VECTORS:
+        print(f"ℹ️  Using flat index: sq8 training only pays off from {SQ8_MIN_VECTORS} vectors")
+        return "flat"
+    return index_type
+
+
+def _trained_index(vectors, index_type):
+    """Create an index ready for adding vectors, training it only if no saved quantizer fits
+    
+    Training depends on the corpus, but for large corpora one trained on an earlier build
+    is close enough and saves retraining on every build.
+    """
+    num_vectors, dim = vectors.shape
+    index = _create_index(dim, index_type, num_vectors=num_vectors)
+    if index.is_trained:
+        return index
+    
+    quantizer_path = os.path.join(QUANTIZER_DIR, f"{index_type}_{dim}.quantizer")
+    if os.path.exists(quantizer_path):
+        saved = faiss.read_index(quantizer_path)
+        if saved.is_trained and saved.ntotal == 0 and saved.d == dim:
+            if isinstance(saved, faiss.IndexIVF):
+                saved.nprobe = IVFPQ_NPROBE
+                saved.make_direct_map()
+            print(f"♻️  Reusing trained {index_type} quantizer from {quantizer_path}")
+            return saved
+    
+    index.train(vectors)
+    os.makedirs(QUANTIZER_DIR, exist_ok=True)
+    # Write a uniquely named file then rename, so a concurrent build never reads a
+    # partial file and concurrent builds never share a temp file
+    fd, tmp_path = tempfile.mkstemp(dir=QUANTIZER_DIR, suffix=".tmp")
+    os.close(fd)
+    try:
+        faiss.write_index(index, tmp_path)
+        os.replace(tmp_path, quantizer_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return index
+
+
+def _create_index(dim, index_type, num_vectors=0):
+    """Create an empty inner-product FAISS index of the given type (IVFPQ must be trained before adding)"""
+    if index_type == "ivfpq":
+        nlist = max(1, min(IVFPQ_MAX_NLIST, num_vectors // 40))
+        index = faiss.IndexIVFPQ(
+            faiss.IndexFlatIP(dim), dim, nlist, IVFPQ_M, IVFPQ_NBITS, faiss.METRIC_INNER_PRODUCT
+        )
+        index.nprobe = IVFPQ_NPROBE
+        # MMR search reconstructs vectors by id
+        index.make_direct_map()
+        return index
+    if index_type in SCALAR_QUANTIZERS:
+        # sq8 learns per-dimension ranges, so it is trained like IVFPQ
+        return faiss.IndexScalarQuantizer(dim, SCALAR_QUANTIZERS[index_type], faiss.METRIC_INNER_PRODUCT)
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+        return index
+    if index_type == "flat":
+        return faiss.IndexFlatIP(dim)
+    raise ValueError(f"Unknown FAISS index type: {index_type}")
+
+
+def _dedupe_documents(documents):
+    """Drop chunks whose text matches an earlier chunk up to whitespace"""
+    seen = set()
+    unique = []
+    for doc in documents:
+        key = hashlib.blake2b(" ".join(doc.page_content.split()).encode("utf-8"), digest_size=16).digest()
+        if key not in seen:
+            seen.add(key)
+            unique.append(doc)
+    if len(unique) < len(documents):
+        print(f"🧹 Skipped {len(documents) - len(unique)} duplicate chunks")
+    return unique
+
+
+def _build_vector_store(documents, embeddings, index_type=None):
+    """Embed documents and index their normalized vectors in a FAISS vector store"""
+    index_type = index_type or FAISS_INDEX_TYPE
+    documents = _dedupe_documents(documents)
+    texts = [doc.page_content for doc in documents]
+    metadatas = [doc.metadata for doc in documents]
+    # One embed_documents call for every chunk; the embeddings class batches the requests
+    vectors = _normalized(embeddings.embed_documents(texts))
+    num_vectors, dim = vectors.shape
+    index_type = _resolve_index_type(index_type, num_vectors, dim)
+    
+    index = _trained_index(vectors, index_type)
+    vector_store = CosineFAISS(embeddings, index, InMemoryDocstore(), {})
+    vector_store.add_embeddings(zip(texts, vectors), metadatas=metadatas)
+    return vector_store
+
+
+def _load_vector_store(load_path, embeddings):
+    """Load a saved FAISS store, restoring cosine search for inner-product indexes"""
+    vector_store = FAISS.load_local(
+        load_path,
+        embeddings,
+        allow_dangerous_deserialization=True
+    )
+    # Indexes saved before the switch to normalized inner product are still L2
+    if vector_store.index.metric_type == faiss.METRIC_INNER_PRODUCT:
+        vector_store = CosineFAISS(
+            embeddings, vector_store.index, vector_store.docstore, vector_store.index_to_docstore_id
+        )
+    return vector_store
+
 class VectorService:
     def __init__(self):
-        # Try DeepSeek embeddings first, fallback to OpenAI
-        try:
-            self.embeddings = get_deepseek_embeddings()
-            print("✅ Using DeepSeek embeddings")
-        except Exception as e:
-            print(f"⚠️  DeepSeek embeddings not available ({e}), falling back to OpenAI")
-            self.embeddings = OpenAIEmbeddings(
-                openai_api_key=os.getenv("OPENAI_API_KEY")
-            )
+        # One embeddings client (and embedding cache) shared by every caller in the process
+        self.embeddings = get_embeddings()
         self.vector_store = None
     
     def create_vector_store(self, documents):
@@ -26,10 +204,7 @@ class VectorService:
             raise ValueError("No documents provided")
         
         print(f"🚀 Creating embeddings for {len(documents)} document chunks...")
-        self.vector_store = FAISS.from_documents(
-            documents=documents,
-            embedding=self.embeddings
-        )
+        self.vector_store = _build_vector_store(documents, self.embeddings)
         print("✅ Vector store created successfully!")
         return self.vector_store
     
@@ -47,11 +222,7 @@ class VectorService:
         if not os.path.exists(load_path):
             raise FileNotFoundError(f"Vector store not found at {load_path}")
         
-        self.vector_store = FAISS.load_local(
-            load_path, 
-            self.embeddings,
-            allow_dangerous_deserialization=True
-        )
+        self.vector_store = _load_vector_store(load_path, self.embeddings)
         print(f"📂 Vector store loaded from {load_path}")
         return self.vector_store
     
@@ -71,31 +242,45 @@ class VectorService:
         
         results = self.vector_store.similarity_search_with_score(query, k=k)
         return results
+    
+    def stats(self):
+        """Embedding cache hit/miss counters (empty if the embeddings cache internally)"""
+        stats = getattr(self.embeddings, "stats", None)
+        return stats() if stats is not None else {}
 
 
+@functools.lru_cache(maxsize=1)
 def get_embeddings():
-    """Get the appropriate embeddings instance (DeepSeek preferred, OpenAI fallback)"""
+    """Get the shared embeddings instance (DeepSeek preferred, OpenAI fallback)
+    
+    Repeat queries and re-uploaded chunks are served from an exact-match cache: DeepSeek
+    embeddings keep their own, other embeddings are wrapped in CachedEmbeddings.
+    """
     try:
         embeddings = get_deepseek_embeddings()
         print("✅ Using DeepSeek embeddings")
-        return embeddings
     except Exception as e:
         print(f"⚠️  DeepSeek embeddings not available ({e}), falling back to OpenAI")
-        from langchain.embeddings import OpenAIEmbeddings
-        return OpenAIEmbeddings(openai_api_key=os.getenv("OPENAI_API_KEY"))
+        embeddings = OpenAIEmbeddings(
+            openai_api_key=os.getenv("OPENAI_API_KEY"),
+            chunk_size=EMBEDDING_BATCH_SIZE
+        )
+    if getattr(embeddings, "caches_embeddings", False):
+        return embeddings
+    return CachedEmbeddings(embeddings)
 
 
-def build_faiss_index(documents, save_path="data/vector_store/faiss_index"):
-    """Build and save FAISS index from documents"""
+def build_faiss_index(documents, save_path="data/vector_store/faiss_index", index_type=None):
+    """Build and save FAISS index from documents
+    
+    index_type overrides FAISS_INDEX_TYPE (flat, hnsw, ivfpq, fp16 or sq8).
+    """
     if not documents:
         raise ValueError("No documents provided")
     
     print(f"🚀 Creating embeddings for {len(documents)} document chunks...")
     embeddings = get_embeddings()
-    vector_store = FAISS.from_documents(
-        documents=documents,
-        embedding=embeddings
-    )
+    vector_store = _build_vector_store(documents, embeddings, index_type)
     
     # Normalize path and ensure directory exists
     save_path = os.path.abspath(save_path)
@@ -122,26 +307,24 @@ def load_faiss_index(load_path="data/vector_store/faiss_index"):
         raise FileNotFoundError(f"FAISS index not found at {load_path}")
     
     embeddings = get_embeddings()
-    vector_store = FAISS.load_local(
-        load_path, 
-        embeddings,
-        allow_dangerous_deserialization=True
-    )
+    vector_store = _load_vector_store(load_path, embeddings)
     print(f"📂 Vector store loaded from {load_path}")
     return vector_store
 
 
+def get_or_build_index(file_path, base_dir="data/vector_store"):
+    """Load the saved index for this resume's content, building and saving it on first use"""
+    index_path = os.path.join(base_dir, file_digest(file_path).hexdigest())
+    if os.path.exists(os.path.join(index_path, "index.faiss")):
+        return load_faiss_index(index_path)
+    return build_faiss_index(ResumeProcessor().load_resume(file_path), index_path)
+
+
 # Quick test function
 if __name__ == "__main__":
-    from resume_service import ResumeProcessor
-    
-    # Load documents
-    processor = ResumeProcessor()
-    chunks = processor.load_resume("sample_resume.pdf")
-    
-    # Create vector store
+    # Load (or build on first run) the vector store for this resume
     vector_service = VectorService()
-    vector_store = vector_service.create_vector_store(chunks)
+    vector_service.vector_store = get_or_build_index("sample_resume.pdf")
     
     # Test search
     results = vector_service.search("Python programming experience")
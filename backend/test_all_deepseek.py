@@ -2,40 +2,49 @@
 
 import sys
 import os
+import asyncio
 
 # Add the backend directory to Python path
 backend_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, backend_dir)
 
-from services.generation_service import gen_cover_letter, gen_interview_questions, answer_query
+from services.generation_service import aanswer_query, agen_cover_letter, agen_interview_questions
+
+async def run_all():
+    """Run the three independent tests concurrently"""
+    return await asyncio.gather(
+        aanswer_query("What is the person's name?"),
+        agen_cover_letter("We are looking for a Python developer with ML experience."),
+        agen_interview_questions("Machine Learning Engineer"),
+        return_exceptions=True
+    )
 
 def test_all():
     print("🌟 DeepSeek Complete Test")
     print("=" * 50)
     
+    answer, cover_letter, questions = asyncio.run(run_all())
+    
     # Test 1: Q&A
     print("\n1️⃣ Testing Q&A with Resume:")
-    try:
-        result = answer_query("What is the person's name?")
-        print(f"✅ Answer: {result}")
-    except Exception as e:
-        print(f"❌ Error: {e}")
+    if isinstance(answer, Exception):
+        print(f"❌ Error: {answer}")
+    else:
+        print(f"✅ Answer: {answer}")
     
     # Test 2: Cover Letter
     print("\n2️⃣ Testing Cover Letter Generation:")
-    try:
-        cover_letter = gen_cover_letter("We are looking for a Python developer with ML experience.")
+    if isinstance(cover_letter, Exception):
+        print(f"❌ Error: {cover_letter}")
+    else:
         print(f"✅ Cover Letter:\n{cover_letter}")
-    except Exception as e:
-        print(f"❌ Error: {e}")
     
     # Test 3: Interview Questions
     print("\n3️⃣ Testing Interview Questions:")
-    try:
-        questions = gen_interview_questions("Machine Learning Engineer")
+    if isinstance(questions, Exception):
+        print(f"❌ Error: {questions}")
+    else:
         print(f"✅ Questions:\n{questions}")
-    except Exception as e:
-        print(f"❌ Error: {e}")
 
 if __name__ == "__main__":
     test_all()
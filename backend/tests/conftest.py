@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Test modules import the backend as top-level packages (services.*, api.*)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
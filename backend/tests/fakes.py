@@ -0,0 +1,16 @@
+from langchain.embeddings.base import Embeddings
+
+
+class KeywordEmbeddings(Embeddings):
+    """Tiny deterministic embeddings: one dimension per keyword
+
+    The 0.1 offset keeps texts without any keyword from embedding to a zero vector.
+    """
+
+    keywords = ["python", "java", "education", "experience"]
+
+    def embed_query(self, text):
+        return [float(text.lower().count(k)) + 0.1 for k in self.keywords]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
@@ -0,0 +1,40 @@
+from backend.services.cached_embeddings import CachedEmbeddings
+
+
+class CountingEmbeddings:
+    """Fake embeddings that record which texts reach the 'API'"""
+
+    model = "fake"
+
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+    def embed_query(self, text):
+        self.calls.append([text])
+        return [float(len(text))]
+
+
+def test_only_misses_are_embedded():
+    inner = CountingEmbeddings()
+    cached = CachedEmbeddings(inner)
+    assert cached.embed_documents(["a", "bb"]) == [[1.0], [2.0]]
+    assert cached.embed_documents(["bb", "ccc", "a"]) == [[2.0], [3.0], [1.0]]
+    assert cached.embed_query("ccc") == [3.0]
+    assert inner.calls == [["a", "bb"], ["ccc"]]
+    stats = cached.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (3, 3, 3)
+
+
+def test_evicts_least_recently_used():
+    inner = CountingEmbeddings()
+    cached = CachedEmbeddings(inner, maxsize=2)
+    cached.embed_query("a")
+    cached.embed_query("bb")
+    cached.embed_query("a")
+    cached.embed_query("ccc")
+    cached.embed_query("bb")
+    assert inner.calls == [["a"], ["bb"], ["ccc"], ["bb"]]
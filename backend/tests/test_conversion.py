@@ -2,32 +2,113 @@
 
 import sys
 import os
-backend_dir = os.path.dirname(os.path.abspath(__file__))
-sys.path.insert(0, backend_dir)
+import re
+import pickle
+import hashlib
+import tempfile
+import functools
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import pytest
 
-from services.resume_service import ResumeProcessor
-from services.vector_service import VectorService
+# pytest puts backend/ on the path via conftest.py; scripts need it added here
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.vector_service import get_or_build_index
+from services.resume_service import file_digest
 from services.conversation_service import ConversationService
+from services.deepseek_service import DEEPSEEK_ERROR_PREFIX
 
-def test_basic_conversation():
-    """Test basic conversation functionality"""
-    print("🧠 Testing Basic Conversation Memory")
-    print("=" * 50)
-    
-    # 1. Load resume
-    print("\n1️⃣ Loading resume...")
-    processor = ResumeProcessor()
-    chunks = processor.load_resume("test_resume.txt")
-    print(f"✅ Loaded {len(chunks)} chunks")
-    
-    # 2. Create vector store
-    print("\n2️⃣ Creating vector store...")
-    vector_service = VectorService()
-    vector_store = vector_service.create_vector_store(chunks)
-    print("✅ Vector store created")
+# Words that usually point back at something earlier in the conversation
+_FOLLOWUP_RE = re.compile(r"\b(it|that|those|which)\b", re.IGNORECASE)
+
+# Memory summaries walk every stored message, so loops only sample one every few turns
+SUMMARY_EVERY = 5
+
+TEST_RESUME_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "test_resume.txt")
+
+# Every test here embeds and queries through a live API
+pytestmark = pytest.mark.skipif(
+    not (os.getenv("DEEPSEEK_API_KEY") or os.getenv("OPENAI_API_KEY")),
+    reason="needs DEEPSEEK_API_KEY or OPENAI_API_KEY"
+)
+
+# Answers are cached on disk across runs (set TEST_LLM_CACHE_DIR="" to disable)
+LLM_CACHE_DIR = os.getenv("TEST_LLM_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".llm_cache"))
+
+@functools.lru_cache(maxsize=1)
+def get_vs():
+    """Load the test resume's vector store once per process
     
-    # 3. Test conversation
-    print("\n3️⃣ Testing conversation with memory...")
+    The index is saved under data/vector_store keyed by the resume's content hash,
+    so later runs skip embedding until the fixture resume changes. All chunks go to
+    the embeddings API in batches of EMBEDDING_BATCH_SIZE (env, default 256).
+    """
+    return get_or_build_index(TEST_RESUME_FIXTURE)
+
+def _answer_cache_path(conv_service, question, preview_mode):
+    """Cache file for a question asked against this resume and conversation state"""
+    memory = conv_service.memory
+    state = [conv_service.memory_type, getattr(memory, "moving_summary_buffer", "")]
+    state += [msg.content for msg in memory.chat_memory.messages]
+    key = hashlib.sha256(file_digest(TEST_RESUME_FIXTURE).digest())
+    key.update(pickle.dumps((state, question, preview_mode)))
+    return os.path.join(LLM_CACHE_DIR, f"{key.hexdigest()}.pkl")
+
+def _load_answer(conv_service, question, preview_mode):
+    """Replay a cached answer into memory, or return the cache path to store under"""
+    cache_path = _answer_cache_path(conv_service, question, preview_mode)
+    if not os.path.exists(cache_path):
+        return None, cache_path
+    with open(cache_path, 'rb') as f:
+        cached = pickle.load(f)
+    conv_service.memory.save_context({"question": question}, {"answer": cached["answer"]})
+    return {"question": question, **cached, "chat_history": conv_service.get_chat_history_formatted()}, None
+
+def _store_answer(cache_path, response):
+    # An API failure would otherwise be replayed on every later run
+    if response["answer"].startswith(DEEPSEEK_ERROR_PREFIX):
+        return response
+    os.makedirs(LLM_CACHE_DIR, exist_ok=True)
+    # Write a uniquely named file then rename, so a concurrent reader never sees a
+    # partial pickle and concurrent test threads never share a temp file
+    fd, tmp_path = tempfile.mkstemp(dir=LLM_CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump({"answer": response["answer"], "source_chunks": response["source_chunks"]}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return response
+
+def cached_ask(conv_service, question, preview_mode=False):
+    """ask_question, served from the on-disk answer cache on repeat runs"""
+    if not LLM_CACHE_DIR:
+        return conv_service.ask_question(question, preview_mode)
+    response, cache_path = _load_answer(conv_service, question, preview_mode)
+    return response or _store_answer(cache_path, conv_service.ask_question(question, preview_mode))
+
+async def acached_ask(conv_service, question, preview_mode=False):
+    """aask_question, served from the on-disk answer cache on repeat runs"""
+    if not LLM_CACHE_DIR:
+        return await conv_service.aask_question(question, preview_mode)
+    response, cache_path = _load_answer(conv_service, question, preview_mode)
+    return response or _store_answer(cache_path, await conv_service.aask_question(question, preview_mode))
+
+@pytest.fixture(scope="module")
+def vector_store():
+    """Vector store shared by every test in this module"""
+    return get_vs()
+
+def test_basic_conversation(vector_store):
+    """Test basic conversation functionality"""
+    print(f"""🧠 Testing Basic Conversation Memory
+{"=" * 50}
+
+💬 Testing conversation with memory...""")
     conv_service = ConversationService(vector_store, memory_type="buffer")
     
     # Basic conversation flow
@@ -39,26 +120,20 @@ def test_basic_conversation():
     ]
     
     for i, question in enumerate(questions, 1):
-        print(f"\n  Q{i}: {question}")
-        response = conv_service.ask_question(question)
-        print(f"  A{i}: {response['answer']}")
+        response = cached_ask(conv_service, question)
+        parts = [f"\n  Q{i}: {question}", f"  A{i}: {response['answer']}"]
         
         # Show memory growth
-        summary = conv_service.get_memory_summary()
-        print(f"  📊 Memory: {summary['conversation_turns']} turns, ~{summary['estimated_tokens']} tokens")
+        if i == len(questions) or i % SUMMARY_EVERY == 0:
+            summary = conv_service.get_memory_summary()
+            parts.append(f"  📊 Memory: {summary['conversation_turns']} turns, ~{summary['estimated_tokens']} tokens")
+        print("\n".join(parts))
     
     return conv_service
 
-def test_memory_types():
+def test_memory_types(vector_store):
     """Compare different memory types"""
-    print("\n\n🔬 Testing Different Memory Types")
-    print("=" * 50)
-    
-    # Load data once
-    processor = ResumeProcessor()
-    chunks = processor.load_resume("test_resume.txt")
-    vector_service = VectorService()
-    vector_store = vector_service.create_vector_store(chunks)
+    print(f"\n\n🔬 Testing Different Memory Types\n{'=' * 50}")
     
     memory_types = ["buffer", "window", "summary"]
     
@@ -74,44 +149,43 @@ def test_memory_types():
         "What would you recommend they improve on?"
     ]
     
-    for memory_type in memory_types:
-        print(f"\n🧪 Testing {memory_type.upper()} memory...")
+    def run_one(memory_type):
+        """Run the whole conversation on one memory type, returning its output lines"""
+        lines = [f"\n🧪 Testing {memory_type.upper()} memory..."]
         
         try:
             conv_service = ConversationService(vector_store, memory_type=memory_type)
             
             for i, question in enumerate(long_conversation, 1):
-                print(f"  Q{i}: {question[:50]}...")
-                response = conv_service.ask_question(question)
-                print(f"  A{i}: {response['answer'][:80]}...")
+                # Only the start of each answer is shown, so don't generate the rest
+                response = cached_ask(conv_service, question, preview_mode=True)
+                lines += [f"  Q{i}: {question[:50]}...", f"  A{i}: {response['answer'][:80]}..."]
                 
-                # Check memory after each question
-                summary = conv_service.get_memory_summary()
-                print(f"       Memory: {summary['conversation_turns']} turns, ~{summary['estimated_tokens']} tokens")
+                # Check memory periodically; the final turn's summary is reused below
+                if i == len(long_conversation) or i % SUMMARY_EVERY == 0:
+                    final_summary = conv_service.get_memory_summary()
+                    lines.append(f"       Memory: {final_summary['conversation_turns']} turns, ~{final_summary['estimated_tokens']} tokens")
             
             # Final memory summary
-            final_summary = conv_service.get_memory_summary()
-            print(f"\n  📊 Final {memory_type} summary:")
-            print(f"     Conversation turns: {final_summary['conversation_turns']}")
-            print(f"     Total messages: {final_summary['total_messages']}")
-            print(f"     Estimated tokens: {final_summary['estimated_tokens']}")
+            lines.append(f"""
+  📊 Final {memory_type} summary:
+     Conversation turns: {final_summary['conversation_turns']}
+     Total messages: {final_summary['total_messages']}
+     Estimated tokens: {final_summary['estimated_tokens']}""")
             
         except Exception as e:
-            print(f"❌ Error with {memory_type} memory: {e}")
             import traceback
-            traceback.print_exc()
+            lines += [f"❌ Error with {memory_type} memory: {e}", traceback.format_exc()]
+        return lines
+    
+    # Memory types share no state; LLM calls wait on the network, so threads overlap them
+    with ThreadPoolExecutor(max_workers=len(memory_types)) as pool:
+        for lines in pool.map(run_one, memory_types):
+            print("\n".join(lines))
 
-def test_follow_up_understanding():
+def test_follow_up_understanding(vector_store):
     """Test how well the system handles follow-up questions"""
-    print("\n\n🎯 Testing Follow-up Question Understanding")
-    print("=" * 50)
-    
-    processor = ResumeProcessor()
-    chunks = processor.load_resume("test_resume.txt")
-    vector_service = VectorService()
-    vector_store = vector_service.create_vector_store(chunks)
-    
-    conv_service = ConversationService(vector_store, memory_type="buffer")
+    print(f"\n\n🎯 Testing Follow-up Question Understanding\n{'=' * 50}")
     
     # Test conversation with ambiguous follow-ups
     test_scenarios = [
@@ -144,36 +218,38 @@ def test_follow_up_understanding():
         }
     ]
     
-    for scenario in test_scenarios:
-        print(f"\n🔍 {scenario['name']}:")
-        print("-" * 30)
-        
-        # Clear memory for each test
-        conv_service.clear_memory()
+    async def run_scenario(scenario):
+        """Run one scenario with its own memory, returning its output lines"""
+        conv_service = ConversationService(vector_store, memory_type="buffer")
+        lines = [f"\n🔍 {scenario['name']}:", "-" * 30]
         
         for i, question in enumerate(scenario['conversation'], 1):
-            print(f"\nQ{i}: {question}")
-            response = conv_service.ask_question(question)
-            print(f"A{i}: {response['answer']}")
+            lines.append(f"\nQ{i}: {question}")
+            response = await acached_ask(conv_service, question)
+            lines.append(f"A{i}: {response['answer']}")
             
             # Check if AI understood the reference
             if i > 1:  # Follow-up questions
-                understanding_check = "it" in question.lower() or "that" in question.lower() or "those" in question.lower() or "which" in question.lower()
+                understanding_check = bool(_FOLLOWUP_RE.search(question))
                 if understanding_check:
-                    print(f"   💡 Follow-up reference detected: {'✅' if len(response['answer']) > 50 else '❌'}")
-
-def test_memory_limits():
-    """Test what happens with very long conversations"""
-    print("\n\n⚠️  Testing Memory Limits")
-    print("=" * 50)
+                    lines.append(f"   💡 Follow-up reference detected: {'✅' if len(response['answer']) > 50 else '❌'}")
+        return lines
     
-    processor = ResumeProcessor()
-    chunks = processor.load_resume("test_resume.txt")
-    vector_service = VectorService()
-    vector_store = vector_service.create_vector_store(chunks)
+    async def run_all():
+        return await asyncio.gather(*(run_scenario(s) for s in test_scenarios))
     
-    # Test with buffer memory (unlimited)
-    print("\n📈 Testing buffer memory with many questions...")
+    # Scenarios are independent, so run them concurrently and print each one whole
+    for lines in asyncio.run(run_all()):
+        print("\n".join(lines))
+
+def test_memory_limits(vector_store):
+    """Test what happens with very long conversations"""
+    print(f"""
+
+⚠️  Testing Memory Limits
+{"=" * 50}
+
+📈 Testing buffer memory with many questions...""")
     conv_service = ConversationService(vector_store, memory_type="buffer")
     
     # Generate many questions
@@ -200,38 +276,61 @@ def test_memory_limits():
         "Salary expectations?"  # This one should fail since not in resume
     ]
     
-    for i, question in enumerate(questions, 1):
-        print(f"\nQ{i}: {question}")
-        try:
-            response = conv_service.ask_question(question)
-            summary = conv_service.get_memory_summary()
-            print(f"A{i}: {response['answer'][:100]}...")
-            print(f"    Memory: {summary['conversation_turns']} turns, ~{summary['estimated_tokens']} tokens")
+    # Elliptical follow-ups need the preceding turns; the rest can be answered standalone
+    dependent = {"What about JavaScript?", "What about the second job?", "Team size managed?"}
+    
+    async def run_conversation():
+        # Answer the standalone questions concurrently, each on a fresh conversation
+        independent = [q for q in questions if q not in dependent]
+        answers = await asyncio.gather(
+            *(acached_ask(ConversationService(vector_store, memory_type="buffer"), q, preview_mode=True) for q in independent),
+            return_exceptions=True
+        )
+        standalone = dict(zip(independent, answers))
+        
+        # Replay the conversation in order: record standalone answers, ask follow-ups live
+        results = []
+        for i, question in enumerate(questions, 1):
+            response = standalone.get(question)
+            if response is None:
+                try:
+                    response = await acached_ask(conv_service, question, preview_mode=True)
+                except Exception as e:
+                    response = e
+            elif not isinstance(response, Exception):
+                conv_service.memory.save_context({"question": question}, {"answer": response["answer"]})
+            if isinstance(response, Exception):
+                results.append((question, response, None))
+                break
+            sample = i == len(questions) or i % SUMMARY_EVERY == 0
+            results.append((question, response, conv_service.get_memory_summary() if sample else None))
+        return results
+    
+    for i, (question, response, summary) in enumerate(asyncio.run(run_conversation()), 1):
+        parts = [f"\nQ{i}: {question}"]
+        if isinstance(response, Exception):
+            parts.append(f"❌ Error at question {i}: {response}")
+            print("\n".join(parts))
+            break
+        parts.append(f"A{i}: {response['answer'][:100]}...")
+        if summary is not None:
+            parts.append(f"    Memory: {summary['conversation_turns']} turns, ~{summary['estimated_tokens']} tokens")
             
             # Warn if memory getting large
             if summary['estimated_tokens'] > 3000:
-                print("    ⚠️  Memory getting large!")
-                
-        except Exception as e:
-            print(f"❌ Error at question {i}: {e}")
-            break
+                parts.append("    ⚠️  Memory getting large!")
+        print("\n".join(parts))
 
-def test_memory_switching():
+def test_memory_switching(vector_store):
     """Test switching between memory types mid-conversation"""
-    print("\n\n🔄 Testing Memory Type Switching")
-    print("=" * 50)
-    
-    processor = ResumeProcessor()
-    chunks = processor.load_resume("test_resume.txt")
-    vector_service = VectorService()
-    vector_store = vector_service.create_vector_store(chunks)
+    print(f"\n\n🔄 Testing Memory Type Switching\n{'=' * 50}")
     
     conv_service = ConversationService(vector_store, memory_type="buffer")
     
     # Start conversation
     print("\n1️⃣ Starting with buffer memory...")
-    conv_service.ask_question("What programming languages does this person know?")
-    conv_service.ask_question("Tell me about their Python experience")
+    cached_ask(conv_service, "What programming languages does this person know?")
+    cached_ask(conv_service, "Tell me about their Python experience")
     
     print(f"Buffer memory: {conv_service.get_memory_summary()['conversation_turns']} turns")
     
@@ -240,12 +339,12 @@ def test_memory_switching():
     conv_service.switch_memory_type("window")
     
     # Continue conversation (should lose previous context)
-    response = conv_service.ask_question("What were we just discussing?")
+    response = cached_ask(conv_service, "What were we just discussing?")
     print(f"Response after memory switch: {response['answer'][:100]}...")
     
     # Add new conversation
-    conv_service.ask_question("What's their work experience?")
-    conv_service.ask_question("Which company was most recent?")
+    cached_ask(conv_service, "What's their work experience?")
+    cached_ask(conv_service, "Which company was most recent?")
     
     print(f"Window memory: {conv_service.get_memory_summary()['conversation_turns']} turns")
 
@@ -261,13 +360,21 @@ def interactive_test():
     print("  - 'debug' to see detailed memory")
     print("  - 'quit' to exit")
     
-    processor = ResumeProcessor()
-    chunks = processor.load_resume("test_resume.txt")
-    vector_service = VectorService()
-    vector_store = vector_service.create_vector_store(chunks)
+    vector_store = get_vs()
     
     conv_service = ConversationService(vector_store, memory_type="buffer")
     
+    async def stream_reply(question):
+        # Print tokens as they arrive; the chain records the full answer in memory
+        prefix = "🤖 Assistant: "
+        async for token in conv_service.astream_question(question):
+            print(prefix + token, end="", flush=True)
+            prefix = ""
+        print()
+    
+    # One event loop for the whole session, so its async HTTP client keeps its connections
+    loop = asyncio.new_event_loop()
+    
     while True:
         try:
             user_input = input("\n💭 You: ").strip()
@@ -289,8 +396,7 @@ def interactive_test():
                 except ValueError as e:
                     print(f"❌ Error: {e}")
             elif user_input:
-                response = conv_service.ask_question(user_input)
-                print(f"🤖 Assistant: {response['answer']}")
+                loop.run_until_complete(stream_reply(user_input))
                 
                 # Show quick memory info
                 summary = conv_service.get_memory_summary()
@@ -301,6 +407,8 @@ def interactive_test():
             break
         except Exception as e:
             print(f"❌ Error: {e}")
+    
+    loop.close()
 
 def main():
     """Run all tests"""
@@ -309,11 +417,14 @@ def main():
     
     # Run automatic tests
     try:
-        test_basic_conversation()
-        test_memory_types()
-        test_follow_up_understanding()
-        test_memory_limits()
-        test_memory_switching()
+        print("\n📚 Loading resume and building vector store...")
+        vector_store = get_vs()
+        
+        test_basic_conversation(vector_store)
+        test_memory_types(vector_store)
+        test_follow_up_understanding(vector_store)
+        test_memory_limits(vector_store)
+        test_memory_switching(vector_store)
         
         print("\n\n✅ All automatic tests completed!")
         
@@ -1,5 +1,14 @@
+import os
+
+import pytest
+
 from backend.services.generation_service import gen_cover_letter
 
+pytestmark = pytest.mark.skipif(
+    not (os.getenv("DEEPSEEK_API_KEY") or os.getenv("OPENAI_API_KEY")),
+    reason="needs DEEPSEEK_API_KEY or OPENAI_API_KEY"
+)
+
 
 def test_cover_letter():
     out = gen_cover_letter("Backend Engineer at FooCorp")
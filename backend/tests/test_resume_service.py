@@ -0,0 +1,12 @@
+from backend.services.resume_service import ResumeProcessor
+
+
+def test_load_resume_from_bytes_matches_file(tmp_path):
+    text = "Python developer with Django experience.\n\n" * 50
+    path = tmp_path / "resume.txt"
+    path.write_text(text, encoding="utf-8")
+    processor = ResumeProcessor(cache_dir=None)
+    from_file = processor.load_resume(str(path))
+    from_bytes = processor.load_resume("upload.txt", text.encode("utf-8"))
+    assert [d.page_content for d in from_bytes] == [d.page_content for d in from_file]
+    assert from_bytes[0].metadata["source"] == "upload.txt"
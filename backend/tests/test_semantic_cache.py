@@ -0,0 +1,42 @@
+from backend.services.semantic_cache import SemanticCache
+from backend.tests.fakes import KeywordEmbeddings
+
+
+def test_near_duplicate_hits():
+    cache = SemanticCache(KeywordEmbeddings(), threshold=0.95)
+    cache.add(cache.embed("Python experience?"), "answer")
+    assert cache.lookup(cache.embed("What Python experience do they have?")) == "answer"
+    assert cache.lookup(cache.embed("Tell me about their education")) is None
+
+
+def test_evicts_least_recently_used():
+    cache = SemanticCache(KeywordEmbeddings(), threshold=0.95, max_entries=2)
+    python, java, education = (cache.embed(q) for q in ("python", "java", "education"))
+    cache.add(python, "python")
+    cache.add(java, "java")
+    cache.lookup(python)
+    cache.add(education, "education")
+    assert len(cache) == 2
+    assert cache.lookup(python) == "python"
+    assert cache.lookup(java) is None
+
+
+def test_expired_entries_miss():
+    cache = SemanticCache(KeywordEmbeddings(), threshold=0.95, ttl=60)
+    python = cache.embed("python")
+    cache.add(python, "python")
+    assert cache.lookup(python) == "python"
+    cache._added_at[0] -= 120
+    assert cache.lookup(python) is None
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "answers.pkl")
+    cache = SemanticCache(KeywordEmbeddings(), threshold=0.95)
+    cache.add(cache.embed("python"), "python")
+    cache.save(path, tag="index-1")
+
+    restored = SemanticCache(KeywordEmbeddings(), threshold=0.95)
+    assert restored.load(path, tag="index-1")
+    assert restored.lookup(restored.embed("python")) == "python"
+    assert not SemanticCache(KeywordEmbeddings()).load(path, tag="index-2")
@@ -0,0 +1,39 @@
+import faiss
+from langchain.schema import Document
+
+from backend.services import vector_service
+from backend.tests.fakes import KeywordEmbeddings
+
+
+DOCS = [Document(page_content=text) for text in ("python experience", "java", "education", "python python")]
+
+
+def test_small_corpus_uses_untrained_flat_index():
+    store = vector_service._build_vector_store(DOCS, KeywordEmbeddings(), index_type="sq8")
+    assert isinstance(store.index, faiss.IndexFlatIP)
+    assert store.similarity_search("python", k=1)[0].page_content == "python python"
+
+
+def test_sq8_index_searches_after_save_and_load(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_service, "SQ8_MIN_VECTORS", 0)
+    monkeypatch.setattr(vector_service, "QUANTIZER_DIR", str(tmp_path / "quantizers"))
+    store = vector_service._build_vector_store(DOCS, KeywordEmbeddings(), index_type="sq8")
+    assert isinstance(store.index, faiss.IndexScalarQuantizer)
+    assert store.similarity_search("python", k=1)[0].page_content == "python python"
+
+    store.save_local(str(tmp_path / "index"))
+    loaded = vector_service._load_vector_store(str(tmp_path / "index"), KeywordEmbeddings())
+    assert isinstance(loaded.index, faiss.IndexScalarQuantizer)
+    assert loaded.similarity_search("education", k=1)[0].page_content == "education"
+
+
+def test_trained_quantizer_is_reused(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(vector_service, "SQ8_MIN_VECTORS", 0)
+    monkeypatch.setattr(vector_service, "QUANTIZER_DIR", str(tmp_path))
+    vector_service._build_vector_store(DOCS, KeywordEmbeddings(), index_type="sq8")
+    assert (tmp_path / "sq8_4.quantizer").exists()
+    assert "Reusing" not in capsys.readouterr().out
+
+    store = vector_service._build_vector_store(DOCS[:2], KeywordEmbeddings(), index_type="sq8")
+    assert "Reusing trained sq8 quantizer" in capsys.readouterr().out
+    assert store.index.ntotal == 2
@@ -5,11 +5,59 @@ This talks to the backend API instead of importing services directly
 
 import streamlit as st
 import requests
-import json
-from typing import Dict, List, Optional
+import orjson
+from urllib3.util.retry import Retry
+from typing import Dict, Iterator, List, Optional
 
 # Configuration
 BACKEND_URL = "http://localhost:8000"  # Backend API URL
+MAX_SOURCES_SHOWN = 2  # Source chunks kept per exchange for display
+SOURCE_PREVIEW_CHARS = 200  # Characters kept per source chunk
+JSON_HEADERS = {"Content-Type": "application/json"}
+# Accepted resume extensions and the Content-Type each is uploaded with
+UPLOAD_MIME_TYPES = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "txt": "text/plain",
+}
+UPLOAD_TYPES = list(UPLOAD_MIME_TYPES)
+# Transport failures, plus non-JSON bodies (e.g. a proxy error page) from orjson
+REQUEST_ERRORS = (requests.exceptions.RequestException, orjson.JSONDecodeError)
+# (connect, read) timeouts in seconds: LLM routes can take a while to answer
+QUICK_TIMEOUT = (3, 10)
+LLM_TIMEOUT = (3, 60)
+UPLOAD_TIMEOUT = (3, 120)  # parsing + embedding a resume
+# Statuses retried on GET; POSTs (asks, uploads) are only retried when the backend
+# refused the request outright, since a 500/502/504 may come after the work was done
+RETRY_STATUSES = [429, 500, 502, 503, 504]
+POST_RETRY_STATUSES = [429, 503]
+
+# Static text for the landing page, built once rather than on every rerun
+EXAMPLE_WITHOUT_MEMORY = """
+Q: What languages does this person know?
+A: Python, JavaScript, Java...
+
+Q: Which has the most experience?
+A: I don't have context about which 
+   languages you're referring to.
+"""
+EXAMPLE_WITH_MEMORY = """
+Q: What languages does this person know?
+A: Python, JavaScript, Java...
+
+Q: Which has the most experience?
+A: Based on our discussion about their 
+   languages, Python has the most experience...
+"""
+EXAMPLE_QUESTIONS = [
+    "What programming languages does this person know?",
+    "Which of those has the most experience?",
+    "What projects used that language?",
+    "How many years of total experience?",
+    "What makes them qualified for a senior role?"
+]
+# One markdown element for the whole list instead of one per question
+EXAMPLE_QUESTIONS_MARKDOWN = "\n".join(f"{i+1}. {eq}" for i, eq in enumerate(EXAMPLE_QUESTIONS))
 
 # Page config
 st.set_page_config(
@@ -18,75 +66,156 @@ st.set_page_config(
     layout="wide"
 )
 
+class _BackendRetry(Retry):
+    """Retry policy that only retries POST on POST_RETRY_STATUSES"""
+    
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if method.upper() == "POST" and status_code not in POST_RETRY_STATUSES:
+            return False
+        return super().is_retry(method, status_code, has_retry_after)
+
 class BackendAPI:
     """Client for communicating with backend API"""
     
     def __init__(self, base_url: str = BACKEND_URL):
         self.base_url = base_url
+        # Reuse keep-alive connections to the backend across calls and reruns
+        self.session = requests.Session()
+        self.session.headers.update({"Connection": "keep-alive"})
+        # Back off and retry on connection failures and throttled/unavailable responses;
+        # read timeouts are not retried so a slow LLM call waits at most one LLM_TIMEOUT
+        retries = _BackendRetry(
+            total=3,
+            read=False,
+            backoff_factor=0.5,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=["GET", "POST"],
+            raise_on_status=False,  # hand the last error response back so its detail is shown
+        )
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retries)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # The health probe runs on every rerun and should fail fast (longest prefix wins)
+        self.session.mount(f"{base_url}/health", requests.adapters.HTTPAdapter(max_retries=0))
+    
+    def _post_json(self, path: str, data: Dict, **kwargs) -> requests.Response:
+        """POST a JSON body serialized with orjson"""
+        return self.session.post(f"{self.base_url}{path}", data=orjson.dumps(data),
+                                 headers=JSON_HEADERS, **kwargs)
     
     def upload_resume(self, file_data, filename: str) -> Dict:
         """Upload resume to backend"""
         try:
-            files = {"file": (filename, file_data, "application/octet-stream")}
-            response = requests.post(f"{self.base_url}/upload", files=files)
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            mime = UPLOAD_MIME_TYPES.get(filename.rsplit(".", 1)[-1].lower(), "application/octet-stream")
+            files = {"file": (filename, file_data, mime)}
+            response = self.session.post(f"{self.base_url}/upload", files=files, timeout=UPLOAD_TIMEOUT)
+            return orjson.loads(response.content)
+        except REQUEST_ERRORS as e:
             return {"error": f"Connection error: {str(e)}"}
     
     def ask_question(self, question: str, memory_type: str = "buffer") -> Dict:
         """Ask a question with conversation memory"""
         try:
             data = {"question": question, "memory_type": memory_type}
-            response = requests.post(f"{self.base_url}/ask", json=data)
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            response = self._post_json("/ask", data, timeout=LLM_TIMEOUT)
+            return orjson.loads(response.content)
+        except REQUEST_ERRORS as e:
+            return {"error": f"Connection error: {str(e)}"}
+    
+    def ask_question_stream(self, question: str, memory_type: str = "buffer", result: Optional[Dict] = None) -> Iterator[str]:
+        """Ask a question, yielding answer tokens as the backend streams them
+        
+        When the stream ends, result (if given) holds "sources" or "error".
+        """
+        result = {} if result is None else result
+        try:
+            data = {"question": question, "memory_type": memory_type}
+            with self._post_json("/ask-stream", data, stream=True, timeout=LLM_TIMEOUT) as response:
+                if response.status_code != 200:
+                    result["error"] = orjson.loads(response.content).get("detail", f"HTTP {response.status_code}")
+                    return
+                event = None
+                for line in response.iter_lines(decode_unicode=True):
+                    if line.startswith("event: "):
+                        event = line[len("event: "):]
+                    elif line.startswith("data: "):
+                        payload = orjson.loads(line[len("data: "):])
+                        if event is None:
+                            yield payload["token"]
+                        else:
+                            result.update(payload)
+                        event = None
+        except REQUEST_ERRORS as e:
+            result["error"] = f"Connection error: {str(e)}"
+    
+    def prefetch_questions(self) -> Dict:
+        """Ask the backend to answer common questions in the background"""
+        try:
+            response = self._post_json("/prefetch", {}, timeout=QUICK_TIMEOUT)
+            return orjson.loads(response.content)
+        except REQUEST_ERRORS as e:
             return {"error": f"Connection error: {str(e)}"}
     
     def clear_memory(self) -> Dict:
         """Clear conversation memory"""
         try:
             data = {"confirm": True}
-            response = requests.post(f"{self.base_url}/clear-memory", json=data)
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            response = self._post_json("/clear-memory", data, timeout=QUICK_TIMEOUT)
+            return orjson.loads(response.content)
+        except REQUEST_ERRORS as e:
             return {"error": f"Connection error: {str(e)}"}
     
     def get_memory_summary(self) -> Dict:
         """Get memory usage summary"""
         try:
-            response = requests.get(f"{self.base_url}/memory-summary")
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            response = self.session.get(f"{self.base_url}/memory-summary", timeout=QUICK_TIMEOUT)
+            return orjson.loads(response.content)
+        except REQUEST_ERRORS as e:
             return {"error": f"Connection error: {str(e)}"}
     
     def generate_cover_letter(self, job_description: str) -> Dict:
         """Generate cover letter"""
         try:
             params = {"job_desc": job_description}
-            response = requests.get(f"{self.base_url}/cover-letter", params=params)
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            response = self.session.get(f"{self.base_url}/cover-letter", params=params, timeout=LLM_TIMEOUT)
+            return orjson.loads(response.content)
+        except REQUEST_ERRORS as e:
             return {"error": f"Connection error: {str(e)}"}
     
     def generate_interview_questions(self, role: str) -> Dict:
         """Generate interview questions"""
         try:
             params = {"role": role}
-            response = requests.get(f"{self.base_url}/interview", params=params)
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            response = self.session.get(f"{self.base_url}/interview", params=params, timeout=LLM_TIMEOUT)
+            return orjson.loads(response.content)
+        except REQUEST_ERRORS as e:
             return {"error": f"Connection error: {str(e)}"}
     
     def health_check(self) -> bool:
         """Check if backend is running"""
         try:
-            response = requests.get(f"{self.base_url}/health", timeout=3)
+            response = self.session.get(f"{self.base_url}/health", timeout=3)
             return response.status_code == 200
         except:
             return False
 
-# Initialize API client
-api = BackendAPI()
+# Initialize API client once per server process; Streamlit reruns this script on every
+# interaction, so a module-level client would open a fresh connection pool each time
+@st.cache_resource
+def get_api() -> BackendAPI:
+    return BackendAPI()
+
+api = get_api()
+
+# The sidebar renders on every rerun; serve its memory summary from a short-lived cache
+@st.cache_data(ttl=5, show_spinner=False)
+def cached_memory_summary(_api: BackendAPI) -> Dict:
+    return _api.get_memory_summary()
+
+# Every rerun checks the backend; reuse a successful probe for 30 seconds
+@st.cache_data(ttl=30, show_spinner=False)
+def cached_health(_api: BackendAPI) -> bool:
+    return _api.health_check()
 
 # Initialize session state
 if 'chat_history' not in st.session_state:
@@ -98,10 +227,12 @@ if 'backend_connected' not in st.session_state:
 
 def check_backend_connection():
     """Check if backend is available"""
-    if api.health_check():
+    if cached_health(api):
         st.session_state.backend_connected = True
         return True
     else:
+        # Don't keep serving a failure, so a restarted backend is picked up on refresh
+        cached_health.clear()
         st.session_state.backend_connected = False
         return False
 
@@ -116,32 +247,55 @@ def load_resume(uploaded_file):
             return False
         
         st.session_state.resume_loaded = True
-        st.session_state.chat_history = []
+        st.session_state.chat_history.clear()
         return result
         
     except Exception as e:
         st.error(f"Error processing resume: {str(e)}")
         return False
 
-def display_chat_history():
-    """Display chat history with conversation context"""
-    if st.session_state.chat_history:
-        st.markdown("### 💬 Conversation History")
-        
-        for i, exchange in enumerate(st.session_state.chat_history):
-            # Question
+def stream_answer(exchange: Dict, memory_type: str) -> bool:
+    """Stream the answer for a pending exchange into the current container"""
+    try:
+        response = {}
+        answer = st.write_stream(api.ask_question_stream(exchange['question'], memory_type, response))
+    except Exception as e:
+        st.error(f"Error: {str(e)}")
+        return False
+    if "error" in response:
+        st.error(f"Error: {response['error']}")
+        return False
+    if not answer:
+        st.error("Error: No answer returned from backend.")
+        return False
+    cached_memory_summary.clear()
+    exchange['answer'] = answer
+    # Truncate once here so reruns render the stored strings as-is
+    sources = response.get('sources', [])
+    exchange['sources'] = [s[:SOURCE_PREVIEW_CHARS] for s in sources[:MAX_SOURCES_SHOWN]]
+    exchange['source_count'] = len(sources)
+    return True
+
+def display_chat_history(history: List[Dict], memory_type: str, pending: Optional[Dict] = None):
+    """Render every exchange once, streaming the answer for the question asked this run"""
+    for exchange in list(history):
+        with st.container():
             with st.chat_message("user"):
                 st.write(exchange['question'])
             
-            # Answer
             with st.chat_message("assistant"):
-                st.write(exchange['answer'])
-                
+                if exchange is pending:
+                    if not stream_answer(exchange, memory_type):
+                        history.remove(exchange)
+                        continue
+                else:
+                    st.write(exchange['answer'])
+
                 # Show sources in expander
-                if exchange.get('sources'):
-                    with st.expander(f"📚 Sources ({len(exchange['sources'])} chunks)"):
-                        for j, source in enumerate(exchange['sources'][:2]):
-                            st.text(f"Source {j+1}: {source[:200]}...")
+                if exchange['sources']:
+                    with st.expander(f"📚 Sources ({exchange['source_count']} chunks)"):
+                        for j, source in enumerate(exchange['sources']):
+                            st.text(f"Source {j+1}: {source}...")
 
 def main():
     st.title("🧠 ResumeGPT Chat Interface")
@@ -158,12 +312,16 @@ def main():
         """)
         return
     
+    # Bind session state once per rerun; chat_history is only ever mutated in place
+    ss = st.session_state
+    history = ss.chat_history
+    
     # Sidebar for controls
     with st.sidebar:
         st.header("🔧 Controls")
         
         # Backend status
-        if st.session_state.backend_connected:
+        if ss.backend_connected:
             st.success("✅ Backend Connected")
         else:
             st.error("❌ Backend Disconnected")
@@ -180,24 +338,34 @@ def main():
         st.header("📄 Upload Resume")
         uploaded_file = st.file_uploader(
             "Choose your resume",
-            type=['pdf', 'docx', 'txt'],
+            type=UPLOAD_TYPES,
             help="Upload your resume to start chatting"
         )
+        prefetch = st.checkbox(
+            "Prefetch common questions",
+            value=False,
+            help="Answer a few common questions right after upload so asking them later is instant (uses extra API calls)"
+        )
         
-        if uploaded_file and not st.session_state.resume_loaded:
+        if uploaded_file and not ss.resume_loaded:
             result = load_resume(uploaded_file)
             if result:
                 st.success(f"✅ Resume processed!")
                 if 'message' in result:
                     st.info(result['message'])
+                if prefetch:
+                    # The backend answers them concurrently in the background; this returns at once
+                    api.prefetch_questions()
+        
+        resume_loaded = ss.resume_loaded
         
         # Memory controls (only show if resume loaded)
-        if st.session_state.resume_loaded:
+        if resume_loaded:
             st.header("🧠 Memory Status")
             
             # Get memory summary
             try:
-                summary_result = api.get_memory_summary()
+                summary_result = cached_memory_summary(api)
                 if "error" not in summary_result and "memory_summary" in summary_result:
                     summary = summary_result["memory_summary"]
                     
@@ -223,7 +391,8 @@ def main():
                 try:
                     result = api.clear_memory()
                     if "error" not in result:
-                        st.session_state.chat_history = []
+                        history.clear()
+                        cached_memory_summary.clear()
                         st.success("Memory cleared!")
                         st.rerun()
                     else:
@@ -232,7 +401,7 @@ def main():
                     st.error(f"Error: {e}")
         
         # Additional tools
-        if st.session_state.resume_loaded:
+        if resume_loaded:
             st.header("🛠️ Resume Tools")
             
             # Cover letter generator
@@ -264,7 +433,7 @@ def main():
                         st.warning("Please enter a role")
     
     # Main chat interface
-    if not st.session_state.resume_loaded:
+    if not resume_loaded:
         st.info("👆 Please upload your resume in the sidebar to start chatting!")
         
         # Show example conversation
@@ -274,37 +443,14 @@ def main():
         
         with col1:
             st.markdown("**Without Memory (Traditional Q&A):**")
-            st.code("""
-Q: What languages does this person know?
-A: Python, JavaScript, Java...
-
-Q: Which has the most experience?
-A: I don't have context about which 
-   languages you're referring to.
-            """)
+            st.code(EXAMPLE_WITHOUT_MEMORY)
         
         with col2:
             st.markdown("**With Memory (Natural Conversation):**")
-            st.code("""
-Q: What languages does this person know?
-A: Python, JavaScript, Java...
-
-Q: Which has the most experience?
-A: Based on our discussion about their 
-   languages, Python has the most experience...
-            """)
+            st.code(EXAMPLE_WITH_MEMORY)
         
         st.markdown("### 🎯 Try These Questions:")
-        example_questions = [
-            "What programming languages does this person know?",
-            "Which of those has the most experience?",
-            "What projects used that language?",
-            "How many years of total experience?",
-            "What makes them qualified for a senior role?"
-        ]
-        
-        for i, eq in enumerate(example_questions):
-            st.markdown(f"**{i+1}.** {eq}")
+        st.markdown(EXAMPLE_QUESTIONS_MARKDOWN)
         
     else:
         # Chat interface
@@ -313,54 +459,21 @@ A: Based on our discussion about their
         # Question input using chat_input (more natural)
         question = st.chat_input("Ask anything about the resume...")
         
+        # A rerun can interrupt a stream; drop its unanswered question rather than ask again
+        history[:] = [exchange for exchange in history if exchange['answer'] is not None]
+        
+        pending = None
         if question:
-            # Add user message to history immediately
-            st.session_state.chat_history.append({
+            # Queue the question; the history loop below streams its answer
+            pending = {
                 'question': question,
                 'answer': None,  # Will be filled when response comes
-                'sources': []
-            })
-            # Show user message
-            with st.chat_message("user"):
-                st.write(question)
-            # Get AI response
-            with st.chat_message("assistant"):
-                with st.spinner("🤔 Thinking..."):
-                    try:
-                        response = api.ask_question(question, memory_type)
-                        if "error" in response:
-                            st.error(f"Error: {response['error']}")
-                            st.session_state.chat_history.pop()
-                        elif 'answer' in response:
-                            st.session_state.chat_history[-1]['answer'] = response['answer']
-                            st.session_state.chat_history[-1]['sources'] = response.get('sources', [])
-                            st.write(response['answer'])
-                            if response.get('sources'):
-                                with st.expander(f"📚 Sources ({len(response['sources'])} chunks)"):
-                                    for i, source in enumerate(response['sources'][:2]):
-                                        st.text(f"Source {i+1}: {source[:200]}...")
-                        else:
-                            st.error("Error: No answer returned from backend.")
-                            st.session_state.chat_history.pop()
-                    except Exception as e:
-                        st.error(f"Error: {str(e)}")
-                        st.session_state.chat_history.pop()
+                'sources': [],
+                'source_count': 0
+            }
+            history.append(pending)
         
-        # Display existing chat history
-        if st.session_state.chat_history:
-            st.markdown("---")
-            for exchange in st.session_state.chat_history[:-1]:  # Don't show the last one (it's already shown above)
-                if exchange['answer']:  # Only show complete exchanges
-                    with st.chat_message("user"):
-                        st.write(exchange['question'])
-                    
-                    with st.chat_message("assistant"):
-                        st.write(exchange['answer'])
-                        
-                        if exchange.get('sources'):
-                            with st.expander(f"📚 Sources"):
-                                for i, source in enumerate(exchange['sources'][:2]):
-                                    st.text(f"Source {i+1}: {source[:200]}...")
+        display_chat_history(history, memory_type, pending)
 
 if __name__ == "__main__":
     main()